@@ -0,0 +1,89 @@
+"""
+Import-time budget for the app's default path ("General Chatbot"):
+
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget-ms 250 --runs 7
+
+Each run imports `streamlit` and then `streamlit_app` in a fresh interpreter. The budget applies to
+the time added by the app's own imports (Streamlit itself is a fixed cost). The exit code is 1 when
+the median is over budget or when a heavy dependency is imported by the default path.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only the tasks that need these may import them (see WORD2VEC_TASKS in streamlit_app.py)
+HEAVY_MODULES = ["gensim", "sklearn", "scipy", "matplotlib", "pandas", "openai", "requests"]
+
+PROBE = """
+import sys, time, json
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import streamlit
+mid = time.perf_counter()
+import streamlit_app
+end = time.perf_counter()
+print(json.dumps({{
+    "streamlit_s": mid - start,
+    "app_s": end - mid,
+    "heavy": sorted(m for m in {heavy!r} if m in sys.modules),
+}}))
+"""
+
+def measure(runs):
+    code = PROBE.format(root=ROOT, heavy=HEAVY_MODULES)
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+def slowest_imports(top=10):
+    """Cumulative import time of the app's own modules, from `python -X importtime`."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {ROOT!r}); import streamlit_app"],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        top_level = name.split(".")[0]
+        own = top_level == "qa_utils" or os.path.exists(os.path.join(ROOT, top_level + ".py"))
+        if own and name != "streamlit_app":
+            rows.append((int(parts[1]), name))
+    return sorted(rows, reverse=True)[:top]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=250.0,
+                        help="median time the app's own imports may add on top of streamlit (default: 250)")
+    args = parser.parse_args(argv)
+
+    results = measure(args.runs)
+    streamlit_ms = statistics.median(r["streamlit_s"] for r in results) * 1000
+    app_ms = statistics.median(r["app_s"] for r in results) * 1000
+    heavy = sorted(set(m for r in results for m in r["heavy"]))
+
+    print(f"streamlit: {streamlit_ms:.0f} ms, streamlit_app on top: {app_ms:.0f} ms "
+          f"(budget {args.budget_ms:.0f} ms, median of {args.runs} runs)")
+    for us, name in slowest_imports():
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if app_ms > args.budget_ms:
+        print(f"OVER BUDGET by {app_ms - args.budget_ms:.0f} ms")
+        failed = True
+    if heavy:
+        print(f"Heavy modules imported on the default path: {', '.join(heavy)}")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
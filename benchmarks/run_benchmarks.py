@@ -0,0 +1,221 @@
+"""
+Offline benchmark suite for PDF ingestion, response generation and the Word2Vec tools.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --tolerance 0.25
+
+Synthetic PDFs are generated locally with PyMuPDF and Streamlit calls are stubbed, so nothing
+touches the network. With --baseline the exit code is 1 when any benchmark regressed.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import contextlib
+import io
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_pdf, make_corpus
+from streamlit_stub import StreamlitStub, patch_streamlit
+
+COMMANDS = {
+    "show_content": "show content",
+    "show_page": "show pdf page 2",
+    "search": "search carbon emissions board",
+    "clustering": "clustering analysis",
+    "esg": "esg analysis",
+    "invalid": "hello there",
+}
+
+def timed(fn, repeat, setup=None):
+    """Run `fn` `repeat` times (after `setup`, untimed) and summarize wall-clock seconds."""
+    runs = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn(arg) if setup else fn()
+            runs.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(runs), "min_s": min(runs), "runs": repeat}
+
+def warm_up(calls):
+    """
+    Call each function once, untimed. The app imports heavy modules (scikit-learn, plotly, ...)
+    on first use, so otherwise the first timed run pays for the import and its result depends
+    on which benchmarks ran before it (e.g. with --only).
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        for fn in calls:
+            fn()
+
+def bench_pdf(results, pages_list, words_per_page, tables_per_page, repeat):
+    import fitz  # PyMuPDF
+    import pdf_context
+    import pdf_clustering
+    from pdf_context import PdfDocument, clean_text, extract_text_by_page, get_pdf_context
+    from response_generator import generate_response
+
+    stub = StreamlitStub()
+    restore = patch_streamlit([pdf_context], stub)
+    try:
+        with fitz.open(stream=make_pdf(3, words_per_page, tables_per_page), filetype="pdf") as doc:
+            stub.session_state["pdf_text"] = PdfDocument(extract_text_by_page(doc, max_pages=len(doc)), file_hash="bench-warm-up")
+        warm_up([lambda prompt=prompt: generate_response(prompt) for prompt in COMMANDS.values()])
+        pdf_clustering._memo.clear()
+
+        for n_pages in pages_list:
+            pdf_bytes = make_pdf(n_pages, words_per_page, tables_per_page)
+            tag = f"pages={n_pages}"
+
+            def extract():
+                with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+                    return extract_text_by_page(doc, max_pages=len(doc))
+            results[f"pdf.extract_text_by_page[{tag}]"] = timed(extract, repeat)
+
+            def extract_lazy():
+                with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+                    return extract_text_by_page(doc, max_pages=len(doc), lazy_tables=True)
+            results[f"pdf.extract_text_by_page.lazy_tables[{tag}]"] = timed(extract_lazy, repeat)
+            with contextlib.redirect_stdout(io.StringIO()):
+                pages = extract()
+
+            with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+                raw = [page.get_text() for page in doc]
+            results[f"pdf.clean_text[{tag}]"] = timed(lambda: [clean_text(t) for t in raw], repeat)
+
+            def fresh_doc():
+                # A new document per run so memoized views and indexes are measured cold
+                stub.session_state["pdf_text"] = PdfDocument(pages, file_hash=f"bench-{n_pages}")
+                pdf_clustering._memo.clear()
+            results[f"pdf.get_pdf_context.all[{tag}]"] = timed(lambda _: get_pdf_context(), repeat, fresh_doc)
+            results[f"pdf.get_pdf_context.page[{tag}]"] = timed(lambda _: get_pdf_context(page=n_pages), repeat, fresh_doc)
+            for name, prompt in COMMANDS.items():
+                results[f"response.{name}[{tag}]"] = timed(lambda _: generate_response(prompt), repeat, fresh_doc)
+    finally:
+        restore()
+
+def bench_word2vec(results, corpus_sizes, repeat):
+    from qa_utils import preprocessing
+    from qa_utils.Word2Vec import model_cache, SKIPGRAM, CBOW, View2D, View3D, CompareSkipgramCBOW
+
+    stub = StreamlitStub(inputs={
+        "skipgram_query": "carbon", "cbow_query": "carbon",
+        "compare_query": "carbon", "similarity_query": "energy",
+    })
+    modules = [SKIPGRAM, CBOW, View2D, View3D, CompareSkipgramCBOW]
+    entry_points = {
+        "SKIPGRAM.plot_skipgram_word2vec": SKIPGRAM.plot_skipgram_word2vec,
+        "CBOW.plot_cbow_word2vec": CBOW.plot_cbow_word2vec,
+        "View2D.plot_word2vec_2d": View2D.plot_word2vec_2d,
+        "View3D.plot_word2vec_3d": View3D.plot_word2vec_3d,
+        "CompareSkipgramCBOW.compare_skipgram_cbow": CompareSkipgramCBOW.compare_skipgram_cbow,
+    }
+
+    def cold():
+        model_cache.clear_cache()
+        preprocessing.clear_memo()
+
+    restore = patch_streamlit(modules, stub)
+    try:
+        warm_corpus = make_corpus(20, seed=2)
+        warm_up([lambda fn=fn: fn(warm_corpus) for fn in entry_points.values()])
+
+        for n in corpus_sizes:
+            corpus = make_corpus(n)
+            for name, fn in entry_points.items():
+                results[f"w2v.{name}.cold[sentences={n}]"] = timed(lambda _: fn(corpus), repeat, cold)
+                # A rerun with unchanged input (e.g. typing a query word)
+                fn(corpus)
+                results[f"w2v.{name}.rerun[sentences={n}]"] = timed(lambda: fn(corpus), repeat)
+
+            # A few lines appended to an already trained corpus (incremental update)
+            appended = corpus + make_corpus(max(1, n // 50), seed=1)
+            def trained_base():
+                cold()
+                SKIPGRAM.plot_skipgram_word2vec(corpus)
+            results[f"w2v.SKIPGRAM.plot_skipgram_word2vec.append[sentences={n}]"] = timed(
+                lambda _: SKIPGRAM.plot_skipgram_word2vec(appended), repeat, trained_base)
+    finally:
+        restore()
+
+def compare(results, baseline, tolerance, min_delta_s=0.0):
+    """
+    Return rows (name, baseline_s, current_s, ratio, regressed) for benchmarks in both runs.
+    Slowdowns smaller than `min_delta_s` are not flagged, so sub-millisecond noise is ignored.
+    """
+    rows = []
+    for name, current in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        ratio = current["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        regressed = ratio > 1 + tolerance and current["median_s"] - base["median_s"] > min_delta_s
+        rows.append((name, base["median_s"], current["median_s"], ratio, regressed))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", default="10,50", help="comma-separated page counts for synthetic PDFs")
+    parser.add_argument("--words-per-page", type=int, default=300)
+    parser.add_argument("--tables-per-page", type=int, default=1)
+    parser.add_argument("--sentences", default="50,200,1000", help="comma-separated Word2Vec corpus sizes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", choices=["pdf", "word2vec"], help="run one group only")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--save-baseline", help="also write the results as a baseline file")
+    parser.add_argument("--baseline", help="compare against this baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio before flagging (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    results = {}
+    if args.only in (None, "pdf"):
+        bench_pdf(results, [int(p) for p in args.pages.split(",")], args.words_per_page, args.tables_per_page, args.repeat)
+    if args.only in (None, "word2vec"):
+        bench_word2vec(results, [int(n) for n in args.sentences.split(",")], args.repeat)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.tolerance, args.min_delta_ms / 1000)
+        report["comparison"] = [
+            {"name": n, "baseline_s": b, "current_s": c, "ratio": r, "regressed": reg} for n, b, c, r, reg in rows
+        ]
+        for n, b, c, r, reg in rows:
+            flag = "REGRESSED" if reg else "ok"
+            print(f"{flag:>9}  {r:6.2f}x  {b * 1000:10.2f} ms -> {c * 1000:10.2f} ms  {n}", file=sys.stderr)
+        if any(reg for *_, reg in rows):
+            exit_code = 1
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
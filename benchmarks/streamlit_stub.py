@@ -0,0 +1,48 @@
+class _Null:
+    """Accepts any Streamlit call or `with` block and does nothing."""
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __getattr__(self, name):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return iter([self, self, self])
+
+    def __bool__(self):
+        return False
+
+class StreamlitStub(_Null):
+    """
+    Stand-in for the `st` module so entry points can be timed without a Streamlit runtime.
+    `text_input` returns the value registered for its key (or its default).
+    """
+
+    def __init__(self, inputs=None):
+        self.session_state = {}
+        self.inputs = inputs or {}
+
+    def text_input(self, label, value="", key=None, **kwargs):
+        return self.inputs.get(key, value)
+
+def patch_streamlit(modules, stub):
+    """Point each module's `st` at `stub`; returns a function that restores the originals."""
+    originals = [(m, getattr(m, "st", None)) for m in modules]
+    for m in modules:
+        m.st = stub
+
+    def restore():
+        for m, st in originals:
+            if st is None:
+                # The module imports streamlit on first use; let it do so again
+                del m.st
+            else:
+                m.st = st
+    return restore
@@ -0,0 +1,50 @@
+import random
+import fitz  # PyMuPDF
+
+WORDS = (
+    "the company report year group business market customer product service revenue growth "
+    "strategy operation management performance financial result increase decrease total net "
+    "carbon emissions climate energy renewable water waste recycling biodiversity pollution "
+    "employees diversity safety training community human rights health wellbeing inclusion "
+    "board governance audit committee directors compliance ethics risk shareholders transparency"
+).split()
+
+def make_text(rng, n_words):
+    words = rng.choices(WORDS, k=n_words)
+    # Sentences of 8-20 words so line wrapping and hyphenation look like real reports
+    out, i = [], 0
+    while i < len(words):
+        n = rng.randint(8, 20)
+        sentence = " ".join(words[i:i + n])
+        out.append(sentence[:1].upper() + sentence[1:] + ".")
+        i += n
+    return " ".join(out)
+
+def make_pdf(n_pages, words_per_page=300, tables_per_page=0, seed=0):
+    """Build a synthetic PDF in memory and return its bytes."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_number in range(n_pages):
+        page = doc.new_page()
+        text_rect = fitz.Rect(50, 50, 545, 450 if tables_per_page else 790)
+        page.insert_textbox(text_rect, make_text(rng, words_per_page), fontsize=7)
+
+        y = 470
+        for t in range(tables_per_page):
+            rows, cols = 4, 4
+            for r in range(rows):
+                for c in range(cols):
+                    cell = fitz.Rect(50 + c * 120, y + r * 16, 170 + c * 120, y + (r + 1) * 16)
+                    page.draw_rect(cell, width=0.5)
+                    label = "Metric" if c == 0 else str(rng.randint(1, 999))
+                    page.insert_text((cell.x0 + 3, cell.y1 - 4), f"{label} {r}" if c == 0 else label, fontsize=7)
+            y += rows * 16 + 20
+            if y > 780:
+                break
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def make_corpus(n_sentences, seed=0):
+    rng = random.Random(seed)
+    return [make_text(rng, rng.randint(8, 20)).rstrip(".") for _ in range(n_sentences)]
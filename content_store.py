@@ -0,0 +1,82 @@
+import sys
+import threading
+import weakref
+
+# Parsed documents by content address. Sessions hold the strong references (their current PDF
+# and the documents their messages point at), so a document uploaded by several sessions is
+# kept once and dropped when no session uses it any more.
+_documents = weakref.WeakValueDictionary()
+_lock = threading.Lock()
+
+def register_document(doc):
+    """Add `doc` to the store and return the canonical instance for its content address."""
+    with _lock:
+        existing = _documents.get(doc.key)
+        if existing is not None:
+            return existing
+        _documents[doc.key] = doc
+        return doc
+
+def lookup_document(key):
+    with _lock:
+        return _documents.get(key)
+
+def make_content_ref(doc, start=None, end=None, prefix="", suffix=""):
+    """Reference to pages `start`..`end` of `doc` (all pages when both are None), wrapped in prefix/suffix."""
+    return {"doc": doc.key, "start": start, "end": end, "prefix": prefix, "suffix": suffix}
+
+def _resolve(ref, docs):
+    doc = docs.get(ref["doc"]) if docs else None
+    return doc if doc is not None else lookup_document(ref["doc"])
+
+def message_length(msg, docs=None):
+    ref = msg.get("content_ref")
+    if ref is None:
+        return len(msg["content"])
+    doc = _resolve(ref, docs)
+    body = doc.range_length(ref["start"], ref["end"]) if doc is not None else 0
+    return len(ref["prefix"]) + body + len(ref["suffix"])
+
+def message_text(msg, docs=None, max_chars=None):
+    """Materialize a message's text, following its content reference if it has one."""
+    ref = msg.get("content_ref")
+    if ref is None:
+        content = msg["content"]
+        return content if max_chars is None else content[:max_chars]
+
+    doc = _resolve(ref, docs)
+    if doc is None:
+        return ref["prefix"] + "⚠️ This PDF content is no longer available." + ref["suffix"]
+    if max_chars is None:
+        return ref["prefix"] + doc.range_text(ref["start"], ref["end"]) + ref["suffix"]
+    body = doc.range_text(ref["start"], ref["end"], max_chars=max(0, max_chars - len(ref["prefix"])))
+    return (ref["prefix"] + body + ref["suffix"])[:max_chars]
+
+def session_memory_stats(messages, docs=None, pdf_doc=None):
+    """
+    Memory held by one session's chat: inline message text, referenced text (counted once per
+    document, however many messages point at it) and how much inline copies would have cost.
+    """
+    inline_bytes = 0
+    ref_messages = 0
+    referenced_chars = 0
+    for msg in messages:
+        if "content_ref" in msg:
+            ref_messages += 1
+            referenced_chars += message_length(msg, docs)
+        else:
+            inline_bytes += sys.getsizeof(msg["content"])
+
+    held = dict(docs or {})
+    if pdf_doc is not None:
+        held[pdf_doc.key] = pdf_doc
+    document_bytes = sum(doc.nbytes for doc in held.values())
+    return {
+        "messages": len(messages),
+        "ref_messages": ref_messages,
+        "inline_bytes": inline_bytes,
+        "document_bytes": document_bytes,
+        "total_bytes": inline_bytes + document_bytes,
+        "referenced_chars": referenced_chars,
+        "documents": len(held),
+    }
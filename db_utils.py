@@ -1,35 +1,128 @@
 import sqlite3
+import queue
+import threading
+from contextlib import contextmanager
 
 DB_PATH = "db/user_profiles.db"
+DEFAULT_USER = "default"
+POOL_SIZE = 4
 
-def init_db():
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_profile (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_name TEXT NOT NULL,
-                user_image TEXT
-            )
-        ''')
-        conn.commit()
-
-def save_user_profile(user_name, user_image):
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM user_profile')  # 確保只有一筆
-        cursor.execute('''
-            INSERT INTO user_profile (user_name, user_image)
-            VALUES (?, ?)
-        ''', (user_name, user_image))
-        conn.commit()
-
-def get_user_profile():
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT user_name, user_image FROM user_profile LIMIT 1')
-        row = cursor.fetchone()
-        if row:
-            return {"user_name": row[0], "user_image": row[1]}
-        else:
-            return None
\ No newline at end of file
+class ConnectionPool:
+    """
+    Long-lived SQLite connections shared by all sessions in the process. Connections use WAL,
+    so readers never block on the writer, and are handed out one thread at a time.
+    """
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; the block runs as one transaction (commit on success, rollback on error)."""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            conn = self._connect() if create else self._idle.get()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._idle.put(conn)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path=None):
+    path = path or DB_PATH
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path)
+        return pool
+
+# Schema migrations, applied in order; PRAGMA user_version records how many have run
+MIGRATIONS = [
+    # 1: original single-profile table
+    '''
+    CREATE TABLE IF NOT EXISTS user_profile (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_name TEXT NOT NULL,
+        user_image TEXT
+    );
+    ''',
+    # 2: one profile per user
+    '''
+    ALTER TABLE user_profile ADD COLUMN user_key TEXT;
+    ALTER TABLE user_profile ADD COLUMN updated_at TEXT;
+    UPDATE user_profile SET user_key = 'legacy-' || id;
+    UPDATE user_profile SET user_key = 'default' WHERE id = (SELECT MAX(id) FROM user_profile);
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_user_profile_user_key ON user_profile (user_key);
+    ''',
+]
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+_profile_cache = {}
+_profile_cache_lock = threading.Lock()
+
+def migrate(conn):
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for number, script in enumerate(MIGRATIONS[version:], version + 1):
+        conn.executescript(f'BEGIN; {script} PRAGMA user_version = {number}; COMMIT;')
+
+def init_db(path=None):
+    # Runs the migrations once per process; later calls (every rerun) return immediately
+    path = path or DB_PATH
+    if path in _initialized:
+        return
+    with _init_lock:
+        if path in _initialized:
+            return
+        with get_pool(path).connection() as conn:
+            migrate(conn)
+        _initialized.add(path)
+
+def save_user_profile(user_name, user_image, user_key=DEFAULT_USER):
+    init_db()
+    with get_pool().connection() as conn:
+        conn.execute('''
+            INSERT INTO user_profile (user_key, user_name, user_image, updated_at)
+            VALUES (?, ?, ?, datetime('now'))
+            ON CONFLICT(user_key) DO UPDATE SET
+                user_name = excluded.user_name,
+                user_image = excluded.user_image,
+                updated_at = excluded.updated_at
+        ''', (user_key, user_name, user_image))
+    with _profile_cache_lock:
+        _profile_cache[user_key] = {"user_name": user_name, "user_image": user_image}
+
+def get_user_profile(user_key=DEFAULT_USER):
+    # Read-through cache: only the first read of each user touches the database
+    with _profile_cache_lock:
+        if user_key in _profile_cache:
+            profile = _profile_cache[user_key]
+            return dict(profile) if profile else None
+
+    init_db()
+    with get_pool().connection() as conn:
+        row = conn.execute('SELECT user_name, user_image FROM user_profile WHERE user_key = ?', (user_key,)).fetchone()
+    profile = {"user_name": row[0], "user_image": row[1]} if row else None
+    with _profile_cache_lock:
+        _profile_cache.setdefault(user_key, profile)
+    return dict(profile) if profile else None
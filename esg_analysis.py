@@ -0,0 +1,198 @@
+import os
+import re
+import threading
+import numpy as np
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "esg_lexicon.tsv")
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_lexicons = {}
+_lexicon_lock = threading.Lock()
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+class EsgLexicon:
+    """
+    Trie over word tokens for a category -> term/phrase lexicon.
+    Pages are scanned left to right with a trie walk from each token, so a scan costs
+    O(tokens x longest phrase) (phrases are a few words long). Matches do not overlap and the
+    longest phrase starting at a position wins: "carbon emissions" counts once, not also as "carbon".
+    """
+
+    def __init__(self, entries, name="custom"):
+        self.name = name
+        self.categories = []
+        self.terms = []
+        self.term_category = []
+        self.word_ids = {}
+
+        # Trie over word ids: goto[state] = {word_id: next_state}
+        goto = [{}]
+        terminal = [-1]
+        seen = {}
+        for category, term in entries:
+            words = tokenize(term)
+            if not words or tuple(words) in seen:
+                continue
+            if category not in self.categories:
+                self.categories.append(category)
+            state = 0
+            for w in words:
+                wid = self.word_ids.setdefault(w, len(self.word_ids))
+                nxt = goto[state].get(wid)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][wid] = nxt
+                    goto.append({})
+                    terminal.append(-1)
+                state = nxt
+            seen[tuple(words)] = len(self.terms)
+            terminal[state] = len(self.terms)
+            self.terms.append(" ".join(words))
+            self.term_category.append(self.categories.index(category))
+
+        self._goto = goto
+        self._terminal = terminal
+        self.term_category = np.array(self.term_category, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def scan(self, text):
+        """Return (token count, list of matched term ids) for one pass over `text`."""
+        goto, terminal, word_ids = self._goto, self._terminal, self.word_ids
+        hits = []
+        # A word outside the lexicon (None) cannot be part of any phrase
+        ids = [word_ids.get(token) for token in tokenize(text)]
+        n = len(ids)
+        i = 0
+        while i < n:
+            state = goto[0].get(ids[i]) if ids[i] is not None else None
+            # Walk the trie while the phrase can still extend, keeping the longest term seen (pending match)
+            best, best_end = -1, i
+            j = i
+            while state is not None:
+                if terminal[state] != -1:
+                    best, best_end = terminal[state], j + 1
+                j += 1
+                if j == n or ids[j] is None:
+                    break
+                state = goto[state].get(ids[j])
+            if best != -1:
+                # Shorter terms inside the match are covered by it
+                hits.append(best)
+                i = best_end
+            else:
+                i += 1
+        return n, hits
+
+def load_lexicon(path=DEFAULT_LEXICON_PATH):
+    """
+    Load a tab-separated `<category>\\t<term>` lexicon file (lines starting with '#' are comments).
+    Compiled automatons are cached per path and rebuilt when the file changes.
+    """
+    mtime = os.path.getmtime(path)
+    with _lexicon_lock:
+        cached = _lexicons.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            category, _, term = line.partition("\t")
+            if term:
+                entries.append((category.strip(), term.strip()))
+    lexicon = EsgLexicon(entries, name=os.path.basename(path))
+
+    with _lexicon_lock:
+        _lexicons[path] = (mtime, lexicon)
+    return lexicon
+
+def score_pages(pages, lexicon):
+    """
+    Args:
+        pages (list[dict]): `{"page": int, "content": str}` items.
+        lexicon (EsgLexicon): Compiled lexicon.
+    Returns:
+        dict: page x category hit matrix (`counts`) and hits per 1,000 words (`density`),
+        document totals and per-term hit counts.
+    """
+    n_pages = len(pages)
+    n_categories = len(lexicon.categories)
+    counts = np.zeros((n_pages, n_categories), dtype=np.int32)
+    tokens = np.zeros(n_pages, dtype=np.int64)
+    term_counts = np.zeros(len(lexicon), dtype=np.int64)
+
+    for i, p in enumerate(pages):
+        n_tokens, hits = lexicon.scan(p["content"])
+        tokens[i] = n_tokens
+        if hits:
+            hits = np.asarray(hits, dtype=np.int32)
+            counts[i] = np.bincount(lexicon.term_category[hits], minlength=n_categories)
+            term_counts += np.bincount(hits, minlength=len(lexicon))
+
+    density = counts / np.maximum(tokens, 1)[:, None] * 1000.0
+    doc_counts = counts.sum(axis=0)
+    return {
+        "categories": list(lexicon.categories),
+        "page_numbers": [p["page"] for p in pages],
+        "counts": counts,
+        "density": density,
+        "tokens": tokens,
+        "doc_counts": doc_counts,
+        "doc_density": doc_counts / max(int(tokens.sum()), 1) * 1000.0,
+        "term_counts": term_counts,
+    }
+
+def get_esg_scores(doc, lexicon_path=DEFAULT_LEXICON_PATH):
+    lexicon = load_lexicon(lexicon_path)
+    return doc.cached(f"esg:{lexicon_path}:{id(lexicon)}", lambda d: score_pages(d.pages, lexicon))
+
+def esg_heatmap_data(doc, lexicon_path=DEFAULT_LEXICON_PATH):
+    """Per-page heatmap data: rows are categories, columns are pages, values are hits per 1,000 words."""
+    scores = get_esg_scores(doc, lexicon_path)
+    return {
+        "x": scores["page_numbers"],
+        "y": scores["categories"],
+        "z": np.round(scores["density"].T, 2).tolist(),
+    }
+
+def esg_heatmap_figure(data):
+    # plotly is only needed once an ESG answer is shown
+    import plotly.graph_objs as go
+
+    fig = go.Figure(go.Heatmap(
+        x=data["x"], y=data["y"], z=data["z"], colorscale="Greens",
+        colorbar=dict(title="per 1,000 words"),
+        hovertemplate="Page %{x}<br>%{y}: %{z:.1f} per 1,000 words<extra></extra>",
+    ))
+    fig.update_layout(title="ESG terms per page", xaxis_title="Page", height=300, margin=dict(l=0, r=0, t=40, b=0))
+    return fig
+
+def esg_summary(doc, lexicon_path=DEFAULT_LEXICON_PATH, top_terms=5, top_pages=3):
+    lexicon = load_lexicon(lexicon_path)
+    scores = get_esg_scores(doc, lexicon_path)
+    total_hits = int(scores["doc_counts"].sum())
+    if total_hits == 0:
+        return "🌱 No ESG-related terms found in this PDF."
+
+    lines = [f"🌱 ESG analysis of {len(doc)} pages ({total_hits} lexicon hits):\n"]
+    for rank, c in enumerate(np.argsort(-scores["doc_density"], kind="stable"), 1):
+        category = scores["categories"][c]
+        in_category = np.flatnonzero(lexicon.term_category == c)
+        best_terms = in_category[np.argsort(-scores["term_counts"][in_category], kind="stable")[:top_terms]]
+        best_terms = [f"{lexicon.terms[t]} ({scores['term_counts'][t]})" for t in best_terms if scores["term_counts"][t] > 0]
+        best_pages = np.argsort(-scores["density"][:, c], kind="stable")[:top_pages]
+        best_pages = [str(scores["page_numbers"][i]) for i in best_pages if scores["counts"][i, c] > 0]
+        lines.append(
+            f"{rank}. **{category}**: {int(scores['doc_counts'][c])} hits, "
+            f"{scores['doc_density'][c]:.1f} per 1,000 words ({scores['doc_counts'][c] / total_hits:.0%} of ESG hits)\n"
+            f"   - Top terms: {', '.join(best_terms) or '-'}\n"
+            f"   - Most {category.lower()}-focused pages: {', '.join(best_pages) or '-'}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,158 @@
+"""
+Headless batch ingestion: parse a directory of PDFs into per-document page artifacts.
+
+    python pdf_batch.py reports/ --workers 8
+    python pdf_batch.py reports/ --output db/artifacts --recursive
+
+Each PDF becomes `<output>/<sha256>.v<EXTRACTION_VERSION>.jsonl`, one page per line with the
+SHA-256 of its content. Files whose artifact already exists are skipped, so an interrupted run
+can simply be restarted. The app loads these artifacts on upload instead of re-parsing.
+"""
+import os
+import sys
+import json
+import time
+import glob
+import hashlib
+import logging
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pdf_context import PDF_WORKERS, SPOOL_CHUNK_BYTES, open_pdf, iter_text_by_page, discard_file, hash_stream
+from pdf_cache import EXTRACTION_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Where artifacts are written by the CLI and looked up by the app
+ARTIFACT_DIR = os.environ.get("PDF_ARTIFACT_DIR", "db/artifacts")
+
+def hash_file(path, chunk_size=SPOOL_CHUNK_BYTES):
+    with open(path, "rb") as f:
+        return hash_stream(f, chunk_size)
+
+def content_hash(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def artifact_path(file_hash, artifact_dir=None):
+    return os.path.join(artifact_dir or ARTIFACT_DIR, f"{file_hash}.v{EXTRACTION_VERSION}.jsonl")
+
+def write_artifact(file_hash, pages, artifact_dir=None):
+    """
+    Write `pages` (an iterable of `{"page", "content"}` dicts, consumed as it is written) to the
+    artifact of `file_hash`. The file only appears once complete, so readers never see a partial one.
+    Returns:
+        int: Number of pages written.
+    """
+    path = artifact_path(file_hash, artifact_dir)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".partial_", suffix=".jsonl", dir=os.path.dirname(path) or ".")
+    n_pages = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for item in pages:
+                f.write(json.dumps({
+                    "page": item["page"],
+                    "content": item["content"],
+                    "content_hash": content_hash(item["content"]),
+                }, ensure_ascii=False) + "\n")
+                n_pages += 1
+        os.replace(tmp_path, path)
+    except BaseException:
+        discard_file(tmp_path)
+        raise
+    return n_pages
+
+def load_artifact(file_hash, artifact_dir=None):
+    """Return the page list stored for `file_hash`, or None if there is no valid artifact."""
+    path = artifact_path(file_hash, artifact_dir)
+    if not os.path.exists(path):
+        return None
+    pages = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if content_hash(record["content"]) != record["content_hash"]:
+                logger.warning("Artifact %s is corrupt (page %s); ignoring it", path, record["page"])
+                return None
+            pages.append({"page": record["page"], "content": record["content"]})
+    return pages
+
+def ingest_file(pdf_path, artifact_dir=None, force=False):
+    """
+    Parse one PDF into its artifact. Runs in a worker process.
+    Returns:
+        dict: `source`, `file_hash`, `status` ("done", "skipped" or "failed"), `pages`, `seconds`.
+    """
+    start = time.perf_counter()
+    result = {"source": pdf_path, "file_hash": None, "status": "failed", "pages": 0, "seconds": 0.0}
+    try:
+        result["file_hash"] = file_hash = hash_file(pdf_path)
+        if not force and os.path.exists(artifact_path(file_hash, artifact_dir)):
+            result["status"] = "skipped"
+        else:
+            with open_pdf(pdf_path) as doc:
+                # Tables are parsed now: artifacts have no source file to load them from later
+                pages = iter_text_by_page(doc, max_pages=len(doc), workers=1)
+                result["pages"] = write_artifact(file_hash, pages, artifact_dir)
+            result["status"] = "done"
+    except Exception as e:
+        logger.warning("Failed to ingest %s: %s", pdf_path, e)
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def find_pdfs(input_dir, recursive=False):
+    pattern = "**/*.pdf" if recursive else "*.pdf"
+    return sorted(p for p in glob.glob(os.path.join(input_dir, pattern), recursive=recursive) if os.path.isfile(p))
+
+def run_batch(pdf_paths, artifact_dir=None, workers=PDF_WORKERS, force=False):
+    """
+    Ingest `pdf_paths` on a pool of `workers` processes (one document per task).
+    Returns:
+        dict: Counts per status, total `pages`, wall-clock `seconds` and `pages_per_s`.
+    """
+    artifact_dir = artifact_dir or ARTIFACT_DIR
+    summary = {"done": 0, "skipped": 0, "failed": 0, "pages": 0, "seconds": 0.0, "pages_per_s": 0.0}
+    start = time.perf_counter()
+    if pdf_paths:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(pdf_paths))), mp_context=ctx) as executor:
+            futures = [executor.submit(ingest_file, path, artifact_dir, force) for path in pdf_paths]
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                summary[result["status"]] += 1
+                summary["pages"] += result["pages"]
+                rate = result["pages"] / result["seconds"] if result["seconds"] and result["pages"] else 0.0
+                logger.info("[%d/%d] %s %s (%d pages, %.1f pages/s)", done, len(futures), result["status"],
+                            result["source"], result["pages"], rate)
+    summary["seconds"] = time.perf_counter() - start
+    if summary["seconds"] > 0:
+        summary["pages_per_s"] = summary["pages"] / summary["seconds"]
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input_dir", help="directory containing the PDFs to ingest")
+    parser.add_argument("--output", default=ARTIFACT_DIR, help=f"artifact directory (default: {ARTIFACT_DIR})")
+    parser.add_argument("--workers", type=int, default=PDF_WORKERS, help="worker processes (default: CPU count)")
+    parser.add_argument("--recursive", action="store_true", help="also ingest PDFs in subdirectories")
+    parser.add_argument("--force", action="store_true", help="re-parse files that already have an artifact")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format="%(message)s")
+    # Per-page progress of each document is too chatty for a batch of hundreds of files
+    logging.getLogger("pdf_context").setLevel(logging.WARNING)
+
+    pdf_paths = find_pdfs(args.input_dir, args.recursive)
+    summary = run_batch(pdf_paths, args.output, args.workers, args.force)
+    print(
+        f"{len(pdf_paths)} file(s): {summary['done']} parsed, {summary['skipped']} skipped, "
+        f"{summary['failed']} failed; {summary['pages']} pages in {summary['seconds']:.1f}s "
+        f"({summary['pages_per_s']:.1f} pages/s)"
+    )
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
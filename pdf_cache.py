@@ -0,0 +1,109 @@
+import hashlib
+import json
+import time
+import threading
+from db_utils import get_pool
+
+CACHE_DB_PATH = "db/pdf_cache.db"
+# Total size of cached extractions kept on disk before least-recently-used entries are evicted
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Bump when extract_text_by_page output changes so stale entries are not served
+EXTRACTION_VERSION = 1
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS pdf_extraction (
+        cache_key TEXT PRIMARY KEY,
+        file_hash TEXT NOT NULL,
+        params TEXT NOT NULL,
+        pages TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        last_access REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_pdf_extraction_access ON pdf_extraction (last_access);
+    CREATE TABLE IF NOT EXISTS pdf_cache_stats (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+'''
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+def _connect():
+    pool = get_pool(CACHE_DB_PATH)
+    if CACHE_DB_PATH not in _initialized:
+        with _init_lock:
+            if CACHE_DB_PATH not in _initialized:
+                with pool.connection() as conn:
+                    conn.executescript(SCHEMA)
+                _initialized.add(CACHE_DB_PATH)
+    return pool.connection()
+
+def make_cache_key(pdf_hash, **params):
+    params = dict(params, version=EXTRACTION_VERSION)
+    params_json = json.dumps(params, sort_keys=True)
+    return hashlib.sha256(f"{pdf_hash}:{params_json}".encode()).hexdigest(), params_json
+
+def _bump(conn, name):
+    conn.execute('''
+        INSERT INTO pdf_cache_stats (name, value) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET value = value + 1
+    ''', (name,))
+
+def get_cached_extraction(pdf_hash, **params):
+    """Return the cached page list for this file and parameters, or None on a miss."""
+    cache_key, _ = make_cache_key(pdf_hash, **params)
+    with _connect() as conn:
+        row = conn.execute('SELECT pages FROM pdf_extraction WHERE cache_key = ?', (cache_key,)).fetchone()
+        if row is None:
+            _bump(conn, "misses")
+            return None
+        conn.execute('UPDATE pdf_extraction SET last_access = ? WHERE cache_key = ?', (time.time(), cache_key))
+        _bump(conn, "hits")
+    return json.loads(row[0])
+
+def put_cached_extraction(pdf_hash, pages, **params):
+    cache_key, params_json = make_cache_key(pdf_hash, **params)
+    pages_json = json.dumps(pages, ensure_ascii=False)
+    size = len(pages_json.encode("utf-8"))
+    if size > CACHE_MAX_BYTES:
+        return
+    with _connect() as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO pdf_extraction (cache_key, file_hash, params, pages, size, last_access)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (cache_key, pdf_hash, params_json, pages_json, size, time.time()))
+        _evict(conn)
+
+def _evict(conn):
+    # Drop least-recently-used entries until the cache fits into CACHE_MAX_BYTES
+    total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pdf_extraction').fetchone()[0]
+    if total <= CACHE_MAX_BYTES:
+        return
+    rows = conn.execute('SELECT cache_key, size FROM pdf_extraction ORDER BY last_access ASC').fetchall()
+    evicted = []
+    for cache_key, size in rows:
+        if total <= CACHE_MAX_BYTES:
+            break
+        evicted.append((cache_key,))
+        total -= size
+    conn.executemany('DELETE FROM pdf_extraction WHERE cache_key = ?', evicted)
+    for _ in evicted:
+        _bump(conn, "evictions")
+
+def get_cache_stats():
+    with _connect() as conn:
+        stats = dict(conn.execute('SELECT name, value FROM pdf_cache_stats').fetchall())
+        entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pdf_extraction').fetchone()
+    return {
+        "hits": stats.get("hits", 0),
+        "misses": stats.get("misses", 0),
+        "evictions": stats.get("evictions", 0),
+        "entries": entries,
+        "size_bytes": size,
+    }
+
+def clear_cache():
+    with _connect() as conn:
+        conn.execute('DELETE FROM pdf_extraction')
+        conn.execute('DELETE FROM pdf_cache_stats')
@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+MAX_CLUSTERS = 12
+# Silhouette scores are computed on a sample so choosing k stays cheap on large documents
+SILHOUETTE_SAMPLE = 2000
+MEMO_SIZE = 16
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+# scikit-learn is imported inside the functions: it takes about a second to import and only
+# the "clustering analysis" command needs it
+
+def _fit(X, k):
+    from sklearn.cluster import MiniBatchKMeans
+
+    model = MiniBatchKMeans(n_clusters=k, random_state=0, batch_size=1024, n_init=3)
+    labels = model.fit_predict(X)
+    return model, labels
+
+def choose_k(X, max_clusters=MAX_CLUSTERS):
+    """Pick the cluster count with the best (sampled) silhouette score."""
+    from sklearn.metrics import silhouette_score
+
+    n = X.shape[0]
+    upper = min(max_clusters, n - 1, max(2, int(np.sqrt(n)) + 1))
+    best = None
+    for k in range(2, upper + 1):
+        model, labels = _fit(X, k)
+        if len(np.unique(labels)) < 2:
+            continue
+        score = silhouette_score(X, labels, metric="cosine", sample_size=min(n, SILHOUETTE_SAMPLE), random_state=0)
+        if best is None or score > best[0]:
+            best = (score, k, model, labels)
+    return best
+
+def cluster_pages(pages, n_clusters=None, top_terms=8, top_pages=3):
+    """
+    Cluster PDF pages on sparse TF-IDF vectors with MiniBatchKMeans.
+    Args:
+        pages (list[dict]): `{"page": int, "content": str}` items.
+        n_clusters (int): Fixed cluster count; chosen by silhouette score when None.
+    Returns:
+        dict: `labels` per page plus, per cluster, its size, top terms and representative pages.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    page_numbers = np.array([p["page"] for p in pages])
+    vectorizer = TfidfVectorizer(stop_words="english", sublinear_tf=True, max_features=50000,
+                                 token_pattern=r"(?u)\b[a-zA-Z][a-zA-Z]+\b")
+    X = vectorizer.fit_transform([p["content"] for p in pages])
+    if X.shape[1] == 0:
+        raise ValueError("no terms to cluster on")
+
+    if n_clusters is None:
+        best = choose_k(X)
+        if best is None:
+            raise ValueError("pages are too similar to split into clusters")
+        silhouette, k, model, labels = best
+    else:
+        k = n_clusters
+        model, labels = _fit(X, k)
+        silhouette = None
+
+    terms = vectorizer.get_feature_names_out()
+    centers = model.cluster_centers_
+    term_idx = np.argsort(-centers, axis=1)[:, :top_terms]
+
+    # Cosine similarity of every page to every centroid (rows of X are already L2-normalised)
+    norms = np.linalg.norm(centers, axis=1, keepdims=True)
+    sims = np.asarray(X @ (centers / np.where(norms == 0, 1, norms)).T)
+    sims[labels[:, None] != np.arange(k)[None, :]] = -np.inf
+    rep_idx = np.argsort(-sims, axis=0)[:top_pages].T
+    sizes = np.bincount(labels, minlength=k)
+
+    clusters = []
+    for c in np.argsort(-sizes):
+        if sizes[c] == 0:
+            continue
+        reps = rep_idx[c][:min(top_pages, sizes[c])]
+        clusters.append({
+            "cluster": int(c),
+            "size": int(sizes[c]),
+            "top_terms": terms[term_idx[c]].tolist(),
+            "representative_pages": page_numbers[reps].tolist(),
+        })
+
+    return {
+        "n_clusters": k,
+        "silhouette": silhouette,
+        "labels": dict(zip(page_numbers.tolist(), labels.tolist())),
+        "clusters": clusters,
+    }
+
+def get_page_clusters(doc):
+    # Memoized per document content hash, so repeated requests (and other sessions) reuse the result
+    key = doc.content_hash
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+    result = cluster_pages(doc.pages)
+    with _memo_lock:
+        _memo[key] = result
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return result
+
+def clustering_summary(doc):
+    if len(doc) < 3:
+        return "📊 Clustering needs at least 3 parsed pages."
+    try:
+        result = get_page_clusters(doc)
+    except ValueError as e:
+        return f"📊 Could not cluster this PDF: {e}."
+
+    lines = [f"📊 Found **{result['n_clusters']} clusters** across {len(doc)} pages"]
+    if result["silhouette"] is not None:
+        lines[0] += f" (silhouette {result['silhouette']:.3f})"
+    lines[0] += ":\n"
+    for i, c in enumerate(result["clusters"], 1):
+        pages = ", ".join(str(p) for p in c["representative_pages"])
+        lines.append(
+            f"{i}. **{c['size']} pages** — top terms: {', '.join(c['top_terms'])}\n"
+            f"   - Representative pages: {pages}"
+        )
+    return "\n".join(lines)
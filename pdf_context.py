@@ -1,5 +1,86 @@
-import streamlit as st
 import re
+import os
+import logging
+import multiprocessing
+import threading
+import hashlib
+import sys
+import sqlite3
+import tempfile
+import weakref
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+import perf
+
+logger = logging.getLogger(__name__)
+
+# Number of worker processes used by extract_text_by_page (1 = serial)
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+# Documents shorter than this are always parsed serially; pool start-up costs more than it saves
+PARALLEL_MIN_PAGES = 16
+# Parse tables only when a page is actually used ("show pdf page N", analyses) instead of during upload
+LAZY_TABLES = os.environ.get("PDF_LAZY_TABLES", "1") == "1"
+# find_tables() builds tables from ruling lines; pages with fewer line/rect edges than this are skipped
+TABLE_MIN_EDGES = 4
+# Uploads are copied here in chunks instead of being held in memory as one bytes object
+SPOOL_DIR = os.environ.get("PDF_SPOOL_DIR") or tempfile.gettempdir()
+SPOOL_CHUNK_BYTES = 1024 * 1024
+# Pages parsed per window; MuPDF's resource store is trimmed between windows
+PAGE_WINDOW = 32
+# Above this much page text a document keeps its pages in a temporary SQLite file instead of memory
+SPILL_THRESHOLD_BYTES = int(os.environ.get("PDF_SPILL_MB", "64")) * 1024 * 1024
+
+def hash_stream(fileobj, chunk_size=SPOOL_CHUNK_BYTES, sink=None):
+    """
+    SHA-256 of `fileobj` read in `chunk_size` pieces, each also written to `sink` if given.
+    This is the file hash used by the extraction cache and the batch artifacts.
+    """
+    h = hashlib.sha256()
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        h.update(chunk)
+        if sink is not None:
+            sink.write(chunk)
+    return h.hexdigest()
+
+def spool_upload(fileobj, chunk_size=SPOOL_CHUNK_BYTES):
+    """
+    Copy an uploaded file to a temporary file in `chunk_size` pieces, hashing it on the way.
+    Returns:
+        tuple[str, str]: Path of the spooled file and its SHA-256 (see hash_stream).
+    """
+    fd, path = tempfile.mkstemp(prefix="pdf_upload_", suffix=".pdf", dir=SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            fileobj.seek(0)
+            digest = hash_stream(fileobj, chunk_size, sink=f)
+    except Exception:
+        discard_file(path)
+        raise
+    return path, digest
+
+def discard_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def open_pdf(source):
+    """Open a PDF from a file path (read from disk as needed) or from raw bytes."""
+    import fitz  # PyMuPDF
+
+    if isinstance(source, (str, os.PathLike)):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+def _trim_pdf_store():
+    # Drops cached fonts/images of pages already parsed, so memory does not grow with page count
+    import fitz  # PyMuPDF
+
+    fitz.TOOLS.store_shrink(100)
 
 def clean_text(text):
     text = re.sub(r'\s+', ' ', text)
@@ -7,53 +88,535 @@ def clean_text(text):
     text = re.sub(r'<[^>]+>', '', text)
     return text.strip()
 
-def extract_text_by_page(doc, max_pages=40, skip_pages=[]):
-    formatted_full_text = []
-    total_items = len(doc)
+def page_may_have_tables(page):
+    # Cheap pre-check (well under a millisecond) before find_tables(), which costs 100+ ms per page
+    with perf.span("pdf.table_precheck"):
+        edges = 0
+        for path in page.get_cdrawings():
+            for item in path["items"]:
+                if item[0] == "l":
+                    edges += 1
+                elif item[0] in ("re", "qu"):
+                    edges += 4
+                if edges >= TABLE_MIN_EDGES:
+                    return True
+        return False
+
+def extract_page_tables(page):
+    this_text = ""
+    if not page_may_have_tables(page):
+        return this_text
+    with perf.span("pdf.find_tables"):
+        tables = page.find_tables()
+    for table in tables:
+        with perf.span("pdf.table_to_pandas"):
+            df = table.to_pandas()
+        with perf.span("pdf.table_to_string"):
+            this_text += "\nTable:\n" + df.to_string() + "\n"
+    return this_text
+
+def extract_page_content(page, tables=True):
+    with perf.span("pdf.get_text"):
+        raw = page.get_text()
+    with perf.span("pdf.clean_text"):
+        this_text = clean_text(raw)
+
+    # Extract tables
+    if tables:
+        this_text += extract_page_tables(page)
+    return this_text
+
+def extract_page_item(page, page_number, lazy_tables=False):
+    """
+    Parse one page into `{"page": int, "content": str}`. With `lazy_tables`, tables are left out
+    and pages that may contain some are marked `"tables_pending": True` (see PdfDocument.load_tables).
+    """
+    item = {"page": page_number + 1, "content": extract_page_content(page, tables=not lazy_tables)}
+    if lazy_tables and page_may_have_tables(page):
+        item["tables_pending"] = True
+    return item
+
+def _extract_page_range(source, page_numbers, lazy_tables=False):
+    # Runs inside a worker process: every worker opens its own copy of the document
+    results = []
+    with open_pdf(source) as doc:
+        for page_number in page_numbers:
+            page = doc[page_number]
+            try:
+                item = extract_page_item(page, page_number, lazy_tables)
+                logger.debug("Text length in page %d: %d", page_number + 1, len(item["content"]))
+                results.append(item)
+            except Exception as e:
+                logger.warning("(extract_text_by_page) Error processing page %d: %s", page_number + 1, e)
+    _trim_pdf_store()
+    return results
+
+def _split_ranges(page_numbers, n_chunks):
+    size = max(1, -(-len(page_numbers) // n_chunks))
+    return [page_numbers[i:i + size] for i in range(0, len(page_numbers), size)]
+
+def _iter_text_by_page_parallel(source, page_numbers, workers, lazy_tables=False):
+    total_pages = len(page_numbers)
+    # A few chunks per worker keeps the pool busy when table-heavy pages cluster together;
+    # no chunk is longer than one window
+    chunks = _split_ranges(page_numbers, max(workers * 4, -(-total_pages // PAGE_WINDOW)))
+
+    # spawn: forking a process that runs Streamlit's server threads is not safe
+    ctx = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+    try:
+        # At most two chunks per worker are in flight, so parsed pages waiting to be consumed stay bounded
+        pending = iter(chunks)
+        futures = deque(executor.submit(_extract_page_range, source, chunk, lazy_tables)
+                        for chunk in islice(pending, workers * 2))
+        done = 0
+        # Chunks are contiguous, so waiting on them in submission order keeps pages in order
+        while futures:
+            yield from futures.popleft().result()
+            done += 1
+            logger.info("Progress: %d%%", round(done / len(chunks) * 100))
+            chunk = next(pending, None)
+            if chunk is not None:
+                futures.append(executor.submit(_extract_page_range, source, chunk, lazy_tables))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    logger.info("Processed %d pages with %d workers", total_pages, workers)
+
+def iter_text_by_page(doc, max_pages=40, skip_pages=[], workers=1, source=None, lazy_tables=False):
+    """
+    Generator version of extract_text_by_page: yields each page as soon as it is parsed.
+    Args:
+        doc (fitz.Document): Opened PDF document.
+        max_pages (int): Only the first `max_pages` pages are read.
+        skip_pages (list[int]): 1-based page numbers to skip.
+        workers (int): Number of worker processes; 1 keeps the serial path.
+        source (str | bytes): PDF path or raw bytes for the workers. Defaults to the file `doc`
+            was opened from, or `doc.tobytes()` for in-memory documents.
+        lazy_tables (bool): Leave tables out and mark the pages that may have some (see extract_page_item).
+    Yields:
+        dict: `{"page": int, "content": str}` in page order.
+    """
     total_pages = min(len(doc), max_pages)
 
+    if workers and workers > 1 and total_pages >= PARALLEL_MIN_PAGES:
+        page_numbers = [n for n in range(total_pages) if n + 1 not in skip_pages]
+        for n in range(total_pages):
+            if n + 1 in skip_pages:
+                logger.info("Skip page %d", n + 1)
+        if source is None:
+            source = doc.name if doc.name and os.path.exists(doc.name) else doc.tobytes()
+        yield from _iter_text_by_page_parallel(source, page_numbers, min(workers, len(page_numbers) or 1), lazy_tables)
+        logger.info("Processing complete!")
+        return
+
     for page_number, page in enumerate(doc):
         if page_number >= max_pages:
             break
         if int(page_number) + 1 in skip_pages:
-            print(f"Skip page {page_number+1}")
+            logger.info("Skip page %d", page_number + 1)
             continue
 
         try:
-            this_text = clean_text(page.get_text())
-
-            # Extract tables
-            tables = page.find_tables()
-            for table in tables:
-                df = table.to_pandas()
-                this_text += "\nTable:\n" + df.to_string() + "\n"
-            print(f"Text length in page {page_number+1}: {len(this_text)}")
+            item = extract_page_item(page, page_number, lazy_tables)
+            logger.debug("Text length in page %d: %d", page_number + 1, len(item["content"]))
 
-            formatted_full_text.append({
-                "page": page_number + 1,
-                "content": this_text
-            })
+            yield item
+            if (page_number + 1) % PAGE_WINDOW == 0:
+                _trim_pdf_store()
 
             # Update progress
             progress = (page_number + 1) / total_pages
-            print(f"Progress: {round(progress*100)}%")
-            print(f"Processing {page_number + 1}/{total_pages} pages with document (max_pages:{max_pages})...")
+            logger.info("Progress: %d%% (%d/%d pages, max_pages: %d)", round(progress * 100), page_number + 1, total_pages, max_pages)
 
         except Exception as e:
-            print(f"(extract_text_by_page) Error processing page {page}: {e}")
+            logger.warning("(extract_text_by_page) Error processing page %d: %s", page_number + 1, e)
+
+    logger.info("Processing complete!")
+
+def extract_text_by_page(doc, max_pages=40, skip_pages=[], workers=1, source=None, lazy_tables=False):
+    """
+    Extract cleaned text (and tables) of each page.
+    Args: see iter_text_by_page.
+    Returns:
+        list[dict]: `{"page": int, "content": str}` in page order.
+    """
+    return list(iter_text_by_page(doc, max_pages=max_pages, skip_pages=skip_pages, workers=workers,
+                                  source=source, lazy_tables=lazy_tables))
+
+class SpilledPages:
+    """
+    Page-number -> content mapping stored in a temporary SQLite file. Supports the dict
+    operations PdfDocument uses; `items()` streams pages from disk in batches.
+    """
+
+    BATCH = 64
+
+    def __init__(self, items=()):
+        fd, self.path = tempfile.mkstemp(prefix="pdf_pages_", suffix=".db", dir=SPOOL_DIR)
+        os.close(fd)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # Scratch data: no journal, no fsync
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE pages (page INTEGER PRIMARY KEY, content TEXT NOT NULL)")
+        self._keys = {}  # page number -> content length, in insertion order like a dict
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, SpilledPages._close, self._conn, self.path)
+        for page_number, content in items:
+            self[page_number] = content
+
+    @staticmethod
+    def _close(conn, path):
+        conn.close()
+        discard_file(path)
+
+    def __setitem__(self, page_number, content):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO pages (page, content) VALUES (?, ?)", (page_number, content))
+            self._keys[page_number] = len(content)
+
+    def __getitem__(self, page_number):
+        content = self.get(page_number)
+        if content is None:
+            raise KeyError(page_number)
+        return content
+
+    def get(self, page_number, default=None):
+        if page_number not in self._keys:
+            return default
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM pages WHERE page = ?", (page_number,)).fetchone()
+        return row[0] if row else default
+
+    def __contains__(self, page_number):
+        return page_number in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def items(self):
+        keys = list(self._keys)
+        for i in range(0, len(keys), self.BATCH):
+            batch = keys[i:i + self.BATCH]
+            with self._lock:
+                rows = dict(self._conn.execute(
+                    f"SELECT page, content FROM pages WHERE page IN ({','.join('?' * len(batch))})", batch
+                ).fetchall())
+            for page_number in batch:
+                yield page_number, rows[page_number]
+
+    def values(self):
+        for _, content in self.items():
+            yield content
+
+    def lengths(self):
+        return list(self._keys.items())
+
+class PdfDocument:
+    """
+    Parsed PDF held in session state: a page-number -> content index plus a memoized
+    full-text view that is rebuilt only after the document changes.
+    Pages parsed with `lazy_tables` get their tables later from `source` (see load_tables).
+    Once the page text outgrows `spill_threshold` bytes it moves to disk (SpilledPages).
+    """
+
+    def __init__(self, pages=(), file_hash=None, source=None, owns_source=False, spill_threshold=SPILL_THRESHOLD_BYTES):
+        self.file_hash = file_hash
+        self.source = source  # PDF path or raw bytes, kept to parse tables on demand
+        if owns_source and isinstance(source, str):
+            # A spooled upload: removed together with the document
+            weakref.finalize(self, discard_file, source)
+        self.spill_threshold = spill_threshold
+        self.version = 0  # bumped when pages are added
+        self.tables_version = 0  # bumped when deferred tables are appended (see load_tables)
+        self._pages = {}
+        self._text_bytes = 0
+        self._tables_pending = set()
+        self._lock = threading.Lock()
+        self._tables_lock = threading.Lock()
+        self._full_text = None
+        self._full_text_version = -1
+        self._content_hash = None
+        self._content_hash_version = -1
+        self._derived = {}
+        for item in pages:
+            self.add_page(item)
+
+    def add_page(self, item):
+        with self._lock:
+            self._pages[item["page"]] = item["content"]
+            self._text_bytes += len(item["content"])
+            if not self.spilled and self.spill_threshold is not None and self._text_bytes > self.spill_threshold:
+                self._spill()
+            if item.get("tables_pending"):
+                self._tables_pending.add(item["page"])
+            else:
+                self._tables_pending.discard(item["page"])
+            self.version += 1
+
+    def _spill(self):
+        self._pages = SpilledPages(self._pages.items())
+        self._full_text = None
+        self._full_text_version = -1
+
+    @property
+    def spilled(self):
+        return isinstance(self._pages, SpilledPages)
+
+    def _items(self):
+        # A snapshot of in-memory pages; spilled pages are streamed from disk instead
+        if self.spilled:
+            return self._pages.items()
+        return list(self._pages.items())
+
+    def __len__(self):
+        return len(self._pages)
+
+    def __contains__(self, page_number):
+        return page_number in self._pages
+
+    def __iter__(self):
+        pending = self._tables_pending
+        for n, c in self._items():
+            yield {"page": n, "content": c, "tables_pending": True} if n in pending else {"page": n, "content": c}
+
+    @property
+    def pages(self):
+        return list(self)
+
+    def page_numbers(self):
+        return list(self._pages)
+
+    def get_page(self, page_number):
+        return self._pages.get(page_number)
+
+    def tables_pending(self, page_numbers=None):
+        pending = set(self._tables_pending)
+        if page_numbers is not None:
+            pending &= set(page_numbers)
+        return sorted(pending)
+
+    def load_tables(self, page_numbers=None):
+        """
+        Parse the tables of pages still marked `tables_pending` (all of them, or only `page_numbers`)
+        and append them to the page content. Every page is parsed at most once.
+        Returns:
+            list[int]: The pages that were parsed.
+        """
+        if not self._tables_pending or self.source is None:
+            return []
+
+        with self._tables_lock:
+            todo = self.tables_pending(page_numbers)
+            if not todo:
+                return []
+            with perf.span("pdf.load_tables"), open_pdf(self.source) as doc:
+                for page_number in todo:
+                    try:
+                        tables = extract_page_tables(doc[page_number - 1])
+                    except Exception as e:
+                        logger.warning("(load_tables) Error processing page %d: %s", page_number, e)
+                        tables = ""
+                    with self._lock:
+                        self._tables_pending.discard(page_number)
+                        if tables:
+                            self._pages[page_number] += tables
+                            self._text_bytes += len(tables)
+                            self.tables_version += 1
+        return todo
+
+    def page_text(self, page_number):
+        content = self._pages.get(page_number)
+        if content is None:
+            return None
+        return f"[Page {page_number}]: {content}"
+
+    def full_text(self):
+        if self.spilled:
+            # Not memoized: keeping it would bring the whole document back into memory
+            return "\n\n".join(f"[Page {n}]: {c}" for n, c in self._items())
+        with self._lock:
+            if self._full_text_version != self.content_version:
+                self._full_text = "\n\n".join([f"[Page {n}]: {c}" for n, c in self._pages.items()])
+                self._full_text_version = self.content_version
+            return self._full_text
+
+    def iter_page_texts(self, start=None, end=None):
+        for n, c in self._items():
+            if (start is None or n >= start) and (end is None or n <= end):
+                yield f"[Page {n}]: {c}"
+
+    def range_text(self, start=None, end=None, max_chars=None):
+        """Formatted text of pages `start`..`end` (inclusive), optionally cut after `max_chars`."""
+        if start is None and end is None and max_chars is None:
+            return self.full_text()
+        parts, size = [], 0
+        for text in self.iter_page_texts(start, end):
+            if parts:
+                parts.append("\n\n")
+                size += 2
+            parts.append(text)
+            size += len(text)
+            if max_chars is not None and size >= max_chars:
+                break
+        text = "".join(parts)
+        return text if max_chars is None else text[:max_chars]
+
+    def range_length(self, start=None, end=None):
+        page_lengths = self._pages.lengths() if self.spilled else [(n, len(c)) for n, c in list(self._pages.items())]
+        lengths = [len(f"[Page {n}]: ") + size for n, size in page_lengths
+                   if (start is None or n >= start) and (end is None or n <= end)]
+        return sum(lengths) + 2 * max(0, len(lengths) - 1)
+
+    @property
+    def nbytes(self):
+        # Memory held by the page texts and the memoized full-text view (spilled pages are on disk)
+        total = 0 if self.spilled else sum(sys.getsizeof(c) for c in list(self._pages.values()))
+        if isinstance(self.source, bytes):
+            total += len(self.source)
+        if self._full_text is not None:
+            total += sys.getsizeof(self._full_text)
+        return total
+
+    @property
+    def key(self):
+        # Content address used by message references: the file hash when known
+        return self.file_hash or self.content_hash
+
+    @property
+    def content_version(self):
+        # Changes with any page content, deferred tables included
+        return (self.version, self.tables_version)
+
+    def cached(self, name, build, tables=True):
+        """
+        Return `build(self)`, memoized until the document changes (e.g. an analysis result).
+        With `tables=False` it is only rebuilt when pages are added, not when deferred tables
+        are parsed (e.g. the search index, which must not be rebuilt after every page view).
+        """
+        version = self.content_version if tables else self.version
+        entry = self._derived.get(name)
+        if entry is None or entry[0] != version:
+            entry = (version, build(self))
+            self._derived[name] = entry
+        return entry[1]
+
+    @property
+    def content_hash(self):
+        # Identifies the parsed content; used to key per-document caches (search index, analyses)
+        with self._lock:
+            if self._content_hash_version != self.content_version:
+                h = hashlib.sha256((self.file_hash or "").encode())
+                for n, c in self._pages.items():
+                    h.update(f"{n}\0{c}\0".encode("utf-8"))
+                self._content_hash = h.hexdigest()
+                self._content_hash_version = self.content_version
+            return self._content_hash
+
+class PdfIngestJob:
+    """
+    Parses a PDF on a background thread and adds pages to `document` as they are ready,
+    so the chat can use the first pages while the rest of the document is still parsing.
+    """
+
+    def __init__(self, source, max_pages=None, skip_pages=[], workers=1, on_complete=None, file_hash=None,
+                 lazy_tables=False, owns_source=False):
+        self.source = source
+        self.skip_pages = skip_pages
+        self.workers = workers
+        self.lazy_tables = lazy_tables
+        self.on_complete = on_complete
+        with open_pdf(source) as doc:
+            self.max_pages = len(doc) if max_pages is None else min(len(doc), max_pages)
+        self.total_pages = len([n for n in range(self.max_pages) if n + 1 not in skip_pages])
+        # The document keeps the source for lazy tables, and an owned (spooled) file so it is removed with it
+        keep_source = lazy_tables or owns_source
+        self.document = PdfDocument(file_hash=file_hash, source=source if keep_source else None, owns_source=owns_source)
+        self.done = False
+        self.error = None
+        # Attribute the job's timings to the session that started it
+        self._perf_session = perf.current_session()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def progress(self):
+        if self.total_pages == 0:
+            return 1.0
+        return min(1.0, len(self.document) / self.total_pages)
+
+    def _run(self):
+        try:
+            # The job has its own thread, so it shows up as its own entry in the debug panel
+            with perf.request(f"pdf ingest ({self.total_pages} pages)", self._perf_session), perf.span("pdf.ingest"):
+                with open_pdf(self.source) as doc:
+                    pages = iter_text_by_page(doc, max_pages=self.max_pages, skip_pages=self.skip_pages,
+                                              workers=self.workers, source=self.source,
+                                              lazy_tables=self.lazy_tables)
+                    for item in pages:
+                        if self._cancel.is_set():
+                            pages.close()
+                            return
+                        self.document.add_page(item)
+                if self.on_complete:
+                    self.on_complete(self.document)
+        except Exception as e:
+            logger.exception("(PdfIngestJob) Error parsing PDF: %s", e)
+            self.error = e
+        finally:
+            self.source = None
+            self.done = True
+
+def _streamlit():
+    # Imported on first use, so parsing also works headless (batch CLI, worker processes)
+    global st
+    if "st" not in globals():
+        import streamlit
+        st = streamlit
+    return st
+
+def get_ingest_status():
+    job = _streamlit().session_state.get("pdf_ingest")
+    if job is None or job.done:
+        return ""
+    return f"⏳ PDF is still being parsed ({len(job.document)}/{job.total_pages} pages ready)."
 
-    print("Processing complete!")
+def get_pdf_document():
+    return _streamlit().session_state.get("pdf_text")
 
-    return formatted_full_text
+def has_pdf_context():
+    doc = get_pdf_document()
+    if doc is None:
+        return False
+    return len(doc) > 0 or bool(get_ingest_status())
 
 def get_pdf_context(page="all") -> str:
-    if "pdf_text" not in st.session_state:
+    doc = get_pdf_document()
+    if doc is None:
         return ""
 
     if page != "all":
-        for p in st.session_state["pdf_text"]:
-            if p["page"] == page:
-                return f"[Page {p['page']}]: {p['content']}"
-        return f"Page {page} not found in the PDF."
+        doc.load_tables([page])
+        page_text = doc.page_text(page)
+        if page_text is not None:
+            return page_text
+        return get_ingest_status() or f"Page {page} not found in the PDF."
 
-    return "\n\n".join([f"[Page {p['page']}]: {p['content']}" for p in st.session_state["pdf_text"]])
\ No newline at end of file
+    doc.load_tables()
+    with perf.span("pdf.full_text"):
+        full_text = doc.full_text()
+    status = get_ingest_status()
+    if status:
+        return f"{full_text}\n\n{status}" if full_text else status
+    return full_text
@@ -0,0 +1,112 @@
+import re
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+class Bm25Index:
+    """
+    Inverted index over PDF pages ranked with Okapi BM25.
+    Postings are stored CSR-style: the postings of term `t` are
+    `doc_ids[offsets[t]:offsets[t+1]]` / `term_freqs[offsets[t]:offsets[t+1]]`.
+    """
+
+    def __init__(self, pages, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.page_numbers = np.array([p["page"] for p in pages], dtype=np.int32)
+        self.vocab = {}
+
+        term_ids, doc_ids = [], []
+        doc_lengths = np.zeros(len(pages), dtype=np.float32)
+        for doc_idx, p in enumerate(pages):
+            tokens = tokenize(p["content"])
+            doc_lengths[doc_idx] = len(tokens)
+            ids = [self.vocab.setdefault(t, len(self.vocab)) for t in tokens]
+            term_ids.extend(ids)
+            doc_ids.extend([doc_idx] * len(ids))
+
+        n_docs = len(pages)
+        n_terms = len(self.vocab)
+        if term_ids:
+            # Collapse (term, doc) pairs into term frequencies, sorted by term then doc
+            pairs = np.asarray(term_ids, dtype=np.int64) * max(n_docs, 1) + np.asarray(doc_ids, dtype=np.int64)
+            keys, counts = np.unique(pairs, return_counts=True)
+            post_terms = keys // max(n_docs, 1)
+            self.doc_ids = (keys % max(n_docs, 1)).astype(np.int32)
+            self.term_freqs = counts.astype(np.float32)
+        else:
+            post_terms = np.zeros(0, dtype=np.int64)
+            self.doc_ids = np.zeros(0, dtype=np.int32)
+            self.term_freqs = np.zeros(0, dtype=np.float32)
+
+        df = np.bincount(post_terms, minlength=n_terms)
+        self.offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(df)
+        df = df.astype(np.float32)
+        self.idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avgdl = doc_lengths.mean() if n_docs else 0.0
+        # Per-document part of the BM25 denominator, precomputed once
+        self.length_norm = (k1 * (1.0 - b + b * doc_lengths / avgdl)) if avgdl else np.full(n_docs, k1, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.page_numbers)
+
+    def scores(self, query):
+        scores = np.zeros(len(self.page_numbers), dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.term_freqs[start:end]
+            scores[docs] += self.idf[t] * tf * (self.k1 + 1.0) / (tf + self.length_norm[docs])
+        return scores
+
+    def search(self, query, top_k=5):
+        """Return `[(page_number, score), ...]` for the best `top_k` pages, best first."""
+        scores = self.scores(query)
+        hits = np.flatnonzero(scores > 0)
+        if hits.size == 0:
+            return []
+        if hits.size > top_k:
+            hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(self.page_numbers[i]), float(scores[i])) for i in hits]
+
+def get_search_index(doc):
+    # Built once per document version and kept on the document itself. Parsing deferred tables
+    # (lazy mode) does not trigger a rebuild, so the index covers the text extracted at upload
+    return doc.cached("bm25_index", lambda d: Bm25Index(d.pages), tables=False)
+
+def make_snippet(text, query, width=160):
+    terms = sorted(set(tokenize(query)), key=len, reverse=True)
+    if not terms:
+        return text[:width]
+    pattern = re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\b", re.IGNORECASE)
+    match = pattern.search(text)
+    if match is None:
+        return text[:width]
+    start = max(0, match.start() - width // 2)
+    end = min(len(text), start + width)
+    snippet = pattern.sub(lambda m: f"**{m.group(0)}**", text[start:end])
+    return ("..." if start > 0 else "") + snippet + ("..." if end < len(text) else "")
+
+def search_pdf(doc, query, top_k=5):
+    """
+    Markdown list of the best matching pages with highlighted snippets.
+    The index covers the text parsed so far; deferred tables are parsed for the result pages only.
+    """
+    results = get_search_index(doc).search(query, top_k=top_k)
+    if not results:
+        return f"🔎 No pages match `{query}`."
+    doc.load_tables([page_number for page_number, _ in results])
+
+    lines = [f"🔎 Top {len(results)} page(s) for `{query}`:\n"]
+    for rank, (page_number, score) in enumerate(results, 1):
+        snippet = make_snippet(doc.get_page(page_number), query).replace("\n", " ")
+        lines.append(f"{rank}. **Page {page_number}** (score {score:.2f}): {snippet}")
+    return "\n".join(lines)
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from collections import deque, OrderedDict
+
+# Off by default. Recording runs while PERF_TRACE=1 (or set_enabled(True)), or while at least
+# one session has the performance panel open (watch)
+_forced = os.environ.get("PERF_TRACE", "0") == "1"
+_enabled = _forced
+# Recent requests kept per session
+RECENT_REQUESTS = 20
+# Sessions whose recent requests are kept; the least recently active one is dropped first
+MAX_SESSIONS = 100
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_histograms = {}  # stage -> [bucket counts..., +Inf count, sum]
+_counters = {}
+_recent = OrderedDict()  # session -> deque of request records
+_watchers = set()
+_current = contextvars.ContextVar("perf_request", default=None)
+
+def _refresh_enabled():
+    global _enabled
+    _enabled = _forced or bool(_watchers)
+
+def set_enabled(enabled):
+    """Record for the whole process, whether or not a panel is open (like PERF_TRACE=1)."""
+    global _forced
+    with _lock:
+        _forced = bool(enabled)
+        _refresh_enabled()
+
+def watch(session, watching=True):
+    """Record while `session` shows the performance panel; recording stops once no session does."""
+    with _lock:
+        if watching:
+            _watchers.add(session)
+        else:
+            _watchers.discard(session)
+        _refresh_enabled()
+
+def sessions():
+    with _lock:
+        return list(set(_recent) | _watchers)
+
+def forget_session(session):
+    """Drop the records of a session that has ended."""
+    with _lock:
+        _recent.pop(session, None)
+        _watchers.discard(session)
+        _refresh_enabled()
+
+def is_enabled():
+    return _enabled
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def _observe(name, seconds):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+        hist[len(BUCKETS)] += 1
+        hist[-1] += seconds
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        _observe(self.name, seconds)
+        req = _current.get()
+        if req is not None:
+            req["spans"].append((self.name, seconds))
+        return False
+
+def span(name):
+    """Time a stage: `with perf.span("pdf.find_tables"): ...`. A shared no-op when disabled."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+def incr(name, value=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+class _Request:
+    def __init__(self, name, session=None):
+        self.record = {"name": name, "session": session, "start": time.time(), "spans": []}
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._token = _current.set(self.record)
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+        self.record["duration_s"] = time.perf_counter() - self._start
+        session = self.record["session"]
+        with _lock:
+            records = _recent.get(session)
+            if records is None:
+                records = _recent[session] = deque(maxlen=RECENT_REQUESTS)
+                while len(_recent) > MAX_SESSIONS:
+                    _recent.popitem(last=False)
+            else:
+                _recent.move_to_end(session)
+            records.append(self.record)
+        return False
+
+def request(name, session=None):
+    """
+    Group the spans of one unit of work (a script rerun, a chat message) for the recent-requests view.
+    `session` tags the record so each user only sees their own requests.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Request(name, session)
+
+def name_request(name):
+    """Rename the request this code runs in, e.g. once a rerun knows which task it serves."""
+    req = _current.get()
+    if req is not None:
+        req["name"] = name
+
+def current_session():
+    """Session of the request this code runs in (None outside a request), e.g. to hand to a worker thread."""
+    req = _current.get()
+    return req["session"] if req is not None else None
+
+def _records(session):
+    with _lock:
+        return list(_recent.get(session, ()))
+
+def recent_requests(session=None):
+    """Requests of `session`, most recent first; each with its spans aggregated per stage as {stage: (total_s, calls)}."""
+    records = _records(session)
+    out = []
+    for rec in reversed(records):
+        stages = {}
+        for name, seconds in rec["spans"]:
+            total, calls = stages.get(name, (0.0, 0))
+            stages[name] = (total + seconds, calls + 1)
+        out.append({"name": rec["name"], "start": rec["start"], "duration_s": rec.get("duration_s", 0.0), "stages": stages})
+    return out
+
+def export_prometheus(prefix="chatbot"):
+    with _lock:
+        histograms = {k: list(v) for k, v in _histograms.items()}
+        counters = dict(_counters)
+    lines = [f"# HELP {prefix}_stage_seconds Time spent per stage.", f"# TYPE {prefix}_stage_seconds histogram"]
+    for stage, hist in sorted(histograms.items()):
+        for bound, count in zip(BUCKETS, hist):
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+        lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {hist[len(BUCKETS)]}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {hist[-1]}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {hist[len(BUCKETS)]}')
+    lines += [f"# HELP {prefix}_events_total Event counters.", f"# TYPE {prefix}_events_total counter"]
+    for name, value in sorted(counters.items()):
+        lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+def export_jsonl(session=None):
+    """One JSON object per recent request of `session`, oldest first."""
+    records = _records(session)
+    return "".join(
+        json.dumps({
+            "name": r["name"],
+            "start": r["start"],
+            "duration_s": r.get("duration_s", 0.0),
+            "spans": [{"stage": n, "seconds": s} for n, s in r["spans"]],
+        }) + "\n"
+        for r in records
+    )
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _recent.clear()
@@ -1,19 +1,19 @@
 import streamlit as st
-from gensim.models import Word2Vec
-from gensim.utils import simple_preprocess
-from gensim.parsing.preprocessing import remove_stopwords
+from qa_utils.Word2Vec.model_cache import get_word2vec_model
+from qa_utils.preprocessing import tokenize_sentences
+from qa_utils.Word2Vec.similarity import get_similarity_index, parse_query_words
 
 def plot_cbow_word2vec(sentences, vector_size=150, window=3, min_count=1):
     st.header("🟠 CBOW Word2Vec")
 
     # Preprocess the sentences
-    tokenized_sentences = [simple_preprocess(remove_stopwords(sentence)) for sentence in sentences]
+    tokenized_sentences = tokenize_sentences(sentences)
     if not tokenized_sentences or all(len(s) == 0 for s in tokenized_sentences):
         st.error("❌ No valid tokens found. Please input meaningful sentences.")
         return None, None
 
     # Train a CBOW Word2Vec model
-    model = Word2Vec(tokenized_sentences, vector_size=vector_size, window=window, min_count=min_count, workers=4, sg=0)
+    model = get_word2vec_model(tokenized_sentences, vector_size=vector_size, window=window, min_count=min_count, sg=0)
 
     # 顯示原始句子
     with st.expander("📄 Show Input Sentences", expanded=False):
@@ -22,13 +22,19 @@ def plot_cbow_word2vec(sentences, vector_size=150, window=3, min_count=1):
 
     # Query
     st.markdown("### 🔍 Try a word to find similar words")
-    query_word = st.text_input("Enter a word to look up:", key="cbow_query")
+    query_text = st.text_input("Enter a word to look up:", key="cbow_query", help="Separate several words with commas")
 
-    if query_word:
-        if query_word in model.wv:
-            st.success(f"Top 5 similar words to **{query_word}**:")
-            st.table(model.wv.most_similar(query_word, topn=5))
-        else:
-            st.warning(f"⚠️ '{query_word}' not in vocabulary.")
+    query_words = parse_query_words(query_text)
+    if query_words:
+        # All query words are answered by one lookup against the model's similarity index
+        index = get_similarity_index(model)
+        found = [w for w in query_words if w in index]
+        neighbours = index.most_similar(found, topn=5)
+        for query_word in query_words:
+            if query_word in neighbours:
+                st.success(f"Top 5 similar words to **{query_word}**:")
+                st.table(neighbours[query_word])
+            else:
+                st.warning(f"⚠️ '{query_word}' not in vocabulary.")
 
     return None, model
@@ -1,41 +1,47 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from gensim.models import Word2Vec
-from gensim.utils import simple_preprocess
-from gensim.parsing.preprocessing import remove_stopwords
+from qa_utils.Word2Vec.model_cache import get_word2vec_models, TOTAL_WORKERS
+from qa_utils.preprocessing import tokenize_sentences
+from qa_utils.Word2Vec.similarity import get_similarity_index, parse_query_words, compare_neighbour_table
 
-def compare_skipgram_cbow(sentences, vector_size=150, window=5, min_count=1):
+def compare_skipgram_cbow(sentences, vector_size=150, window=5, min_count=1, total_workers=TOTAL_WORKERS):
     st.header("🔴 Compare Skip-gram and CBOW Models")
 
     # 預處理
-    tokenized_sentences = [
-        simple_preprocess(remove_stopwords(sentence)) for sentence in sentences
-    ]
+    tokenized_sentences = tokenize_sentences(sentences)
     if not tokenized_sentences or all(len(s) == 0 for s in tokenized_sentences):
         st.error("❌ No valid tokens found. Please input meaningful sentences.")
         return None, None
 
-    # 訓練兩個模型
-    skipgram_model = Word2Vec(tokenized_sentences, vector_size=vector_size, window=window, min_count=min_count, workers=4, sg=1)
-    cbow_model = Word2Vec(tokenized_sentences, vector_size=vector_size, window=window, min_count=min_count, workers=4, sg=0)
+    # 同時訓練兩個模型（共用詞彙表）
+    params = {"vector_size": vector_size, "window": window, "min_count": min_count}
+    skipgram_model, cbow_model = get_word2vec_models(
+        tokenized_sentences, [dict(params, sg=1), dict(params, sg=0)], total_workers=total_workers
+    )
 
     # 展示輸入句子
     with st.expander("📄 Show Input Sentences", expanded=False):
         for i, s in enumerate(sentences, 1):
             st.markdown(f"**Sentence {i}:** {s}")
 
-    # 輸入要查的 Query Word
-    query_word = st.text_input("🔍 Enter a word to explore:", key="compare_query")
-    
-    if query_word:
-        if query_word in skipgram_model.wv and query_word in cbow_model.wv:
-            # 顯示兩個模型的 top 5 相似詞
-            st.markdown("### ✨ Top 5 Similar Words (Skip-gram)")
-            st.table(skipgram_model.wv.most_similar(query_word, topn=5))
+    # 輸入要查的 Query Word（可用逗號分隔多個字）
+    query_text = st.text_input("🔍 Enter a word to explore:", key="compare_query", help="Separate several words with commas")
+    query_words = parse_query_words(query_text)
 
-            st.markdown("### ✨ Top 5 Similar Words (CBOW)")
-            st.table(cbow_model.wv.most_similar(query_word, topn=5))
+    if query_words:
+        found = [w for w in query_words if w in skipgram_model.wv and w in cbow_model.wv]
+        for w in query_words:
+            if w not in found:
+                st.warning(f"⚠️ '{w}' not found in the vocabulary.")
+
+        if found:
+            query_word = found[0]
+
+            # 並排顯示兩個模型的 top 5 相似詞（所有查詢字一次計算）
+            st.markdown("### ✨ Top 5 Similar Words (Skip-gram vs CBOW)")
+            table = compare_neighbour_table(get_similarity_index(skipgram_model), get_similarity_index(cbow_model), found, topn=5)
+            st.dataframe(table, hide_index=True)
 
             # 額外輸入 Compare Word
             st.markdown("---")
@@ -76,7 +82,5 @@ def compare_skipgram_cbow(sentences, vector_size=150, window=5, min_count=1):
 
                 else:
                     st.warning(f"⚠️ '{compare_word}' not found in the vocabulary.")
-        else:
-            st.warning(f"⚠️ '{query_word}' not found in the vocabulary.")
 
     return None, (skipgram_model, cbow_model)
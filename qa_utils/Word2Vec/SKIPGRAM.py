@@ -1,8 +1,8 @@
 import streamlit as st
 import numpy as np
-from gensim.models import Word2Vec
-from gensim.utils import simple_preprocess
-from gensim.parsing.preprocessing import remove_stopwords
+from qa_utils.Word2Vec.model_cache import get_word2vec_model
+from qa_utils.preprocessing import tokenize_sentences
+from qa_utils.Word2Vec.similarity import get_similarity_index, parse_query_words
 
 
 def plot_skipgram_word2vec(sentences, vector_size=100, window=5, min_count=1):
@@ -10,31 +10,35 @@ def plot_skipgram_word2vec(sentences, vector_size=100, window=5, min_count=1):
     st.header("🟡 Skip-gram Word2Vec")
 
     # Preprocess the sentences
-    tokenized_sentences = [
-        simple_preprocess(remove_stopwords(sentence)) for sentence in sentences
-    ]   
+    tokenized_sentences = tokenize_sentences(sentences)
     if not tokenized_sentences or all(len(s) == 0 for s in tokenized_sentences):
         st.error("❌ No valid words found in your input. Please input meaningful sentences.")
         return None, None
     
     # Train a skip-gram Word2Vec model
-    model = Word2Vec(tokenized_sentences, vector_size=vector_size, window=window, min_count=min_count, workers=4,sg=1)
+    model = get_word2vec_model(tokenized_sentences, vector_size=vector_size, window=window, min_count=min_count, sg=1)
     
     # Query
     st.markdown("### 🔍 Try a word to find similar words")
-    query_word = st.text_input("Enter a word to look up:", key="skipgram_query")
+    query_text = st.text_input("Enter a word to look up:", key="skipgram_query", help="Separate several words with commas")
 
     # Optional: Show input
     with st.expander("📄 Show Input Sentences", expanded=False):
         for i, s in enumerate(sentences, 1):
             st.markdown(f"**Sentence {i}:** {s}")
 
-    if query_word:
-        if query_word in model.wv:
-            st.success(f"Top 5 similar words to **{query_word}**:")
-            st.table(model.wv.most_similar(query_word, topn=5))
-        else:
-            st.warning(f"⚠️ '{query_word}' not in vocabulary.")
+    query_words = parse_query_words(query_text)
+    if query_words:
+        # All query words are answered by one lookup against the model's similarity index
+        index = get_similarity_index(model)
+        found = [w for w in query_words if w in index]
+        neighbours = index.most_similar(found, topn=5)
+        for query_word in query_words:
+            if query_word in neighbours:
+                st.success(f"Top 5 similar words to **{query_word}**:")
+                st.table(neighbours[query_word])
+            else:
+                st.warning(f"⚠️ '{query_word}' not in vocabulary.")
 
     return None, model
 
@@ -1,93 +1,103 @@
 import numpy as np
 import plotly.graph_objs as go
 import streamlit as st
-from sklearn.decomposition import PCA
-from gensim.models import Word2Vec
-from gensim.utils import simple_preprocess
-import matplotlib.pyplot as plt
+from qa_utils.Word2Vec.model_cache import get_word2vec_model
+from qa_utils.Word2Vec.projection import get_projection
+from qa_utils.preprocessing import tokenize_sentences
+from qa_utils.Word2Vec.plot_utils import *
+import perf
 
-def plot_word2vec_3d(sentences, vector_size=100, window=5, min_count=1):
+def plot_word2vec_3d(sentences, vector_size=100, window=5, min_count=1,
+                     point_budget=POINT_BUDGET, label_budget=LABEL_BUDGET):
     
     st.header("🟢 3D Word Embedding Visualization")
 
     # Preprocess the sentences
-    tokenized_sentences = [simple_preprocess(sentence) for sentence in sentences]
+    tokenized_sentences = tokenize_sentences(sentences, remove_stop=False)
     if not tokenized_sentences or all(len(s) == 0 for s in tokenized_sentences):
         st.error("❌ No valid words found in your input.")
         return None, None
     
     # Train a Word2Vec model
-    model = Word2Vec(tokenized_sentences, vector_size=vector_size, window=window, min_count=min_count, workers=4)
-    # Get the word vectors
-    word_vectors = np.array([model.wv[word] for word in model.wv.index_to_key])
+    model = get_word2vec_model(tokenized_sentences, vector_size=vector_size, window=window, min_count=min_count)
+    # Get the word vectors (rows follow model.wv.index_to_key)
+    word_vectors = model.wv.vectors
     if word_vectors.shape[0] < 3 or word_vectors.shape[1] < 3:
         st.error("❌ Not enough data to perform PCA.")
         return None, None
     
     # Reduce the dimensions to 3D using PCA
-    pca = PCA(n_components=3)
-    reduced_vectors = pca.fit_transform(word_vectors)
+    # (fitted once per model and shared with the 2D view)
+    reduced_vectors = get_projection(model).coords[:, :3]
 
-    # Generate distinct colors
-    cmap = plt.get_cmap('tab20', len(tokenized_sentences))
-    hex_colors = ['#%02x%02x%02x' % (int(r*255), int(g*255), int(b*255)) for r, g, b, a in [cmap(i) for i in range(len(tokenized_sentences))]]
+    with perf.span("w2v.plotly_figure"):
+        # Generate distinct colors; each word takes the color of the first sentence it appears in
+        hex_colors, colors = word_colors(tokenized_sentences, model.wv.key_to_index)
 
-    word_colors = []
-    for word in model.wv.index_to_key:
-        for i, sentence in enumerate(tokenized_sentences):
-            if word in sentence:
-                word_colors.append(hex_colors[i])
-                break
-    
-    # Plot points
-    word_ids = [f"word-{i}" for i in range(len(model.wv.index_to_key))]
-
-    scatter = go.Scatter3d(
-        x=reduced_vectors[:, 0],
-        y=reduced_vectors[:, 1],
-        z=reduced_vectors[:, 2],
-        mode='markers+text',
-        text=model.wv.index_to_key,
-        textposition='top center',
-        marker=dict(color=word_colors, size=8),
-        customdata=word_colors,
-        ids=word_ids,
-        hovertemplate="Word: %{text}<br>Color: %{customdata}"
-    )
+        # Plot points (Scatter3d is WebGL already; above the point budget keep the most frequent words)
+        words = np.array(model.wv.index_to_key, dtype=object)
+        keep = select_points(word_counts(model.wv), point_budget)
+        if len(keep) < len(words):
+            st.info(f"ℹ️ Showing the {len(keep)} most frequent of {len(words)} words.")
+        word_ids = np.char.add("word-", keep.astype(str))
 
-    # Create line traces for each displayed sentence
-    display_array = [True] * len(tokenized_sentences)
+        scatter = go.Scatter3d(
+            x=reduced_vectors[keep, 0],
+            y=reduced_vectors[keep, 1],
+            z=reduced_vectors[keep, 2],
+            mode='markers+text',
+            text=point_labels(words[keep], label_budget),
+            hovertext=words[keep],
+            textposition='top center',
+            marker=dict(color=colors[keep], size=8),
+            customdata=colors[keep],
+            ids=word_ids,
+            hovertemplate="Word: %{hovertext}<br>Color: %{customdata}"
+        )
 
-    # Create line traces for each sentence
-    line_traces = []
-    for i, sentence in enumerate(tokenized_sentences):
-        if display_array[i]:
-            line_vectors = [reduced_vectors[model.wv.key_to_index[word]] for word in sentence if word in model.wv]
-            line_trace = go.Scatter3d(
-                x=[vector[0] for vector in line_vectors],
-                y=[vector[1] for vector in line_vectors],
-                z=[vector[2] for vector in line_vectors],
+        # Create line traces for each sentence
+        paths = sentence_paths(tokenized_sentences, model.wv.key_to_index, keep)
+        line_traces = []
+        if len(paths) <= MAX_SENTENCE_TRACES:
+            for i, ids in enumerate(paths):
+                line_trace = go.Scatter3d(
+                    x=reduced_vectors[ids, 0],
+                    y=reduced_vectors[ids, 1],
+                    z=reduced_vectors[ids, 2],
+                    mode='lines',
+                    line=dict(color=hex_colors[i], dash='solid'),
+                    showlegend=False,
+                    hoverinfo='none'  # Disable line trace hover info
+                )
+                line_traces.append(line_trace)
+        else:
+            # Too many sentences for one trace each: draw all paths as a single trace
+            coords = merged_path_coords(paths, reduced_vectors)
+            line_traces.append(go.Scatter3d(
+                x=coords[:, 0],
+                y=coords[:, 1],
+                z=coords[:, 2],
                 mode='lines',
-                line=dict(color=hex_colors[i], dash='solid'),
+                line=dict(color='rgba(120,120,120,0.3)'),
                 showlegend=False,
-                hoverinfo='none'  # Disable line trace hover info
-            )
-            line_traces.append(line_trace)
+                hoverinfo='none'
+            ))
 
-    fig = go.Figure(data=[scatter] + line_traces)
+        fig = go.Figure(data=[scatter] + line_traces)
+
+        # Set the plot title and axis labels
+        fig.update_layout(
+            scene=dict(xaxis_title="X", yaxis_title="Y", zaxis_title="Z"),
+            title="3D Visualization of Word Embeddings",
+            width=1000,  # Custom width
+            height=1000  # Custom height
+        )
 
-    # Set the plot title and axis labels
-    fig.update_layout(
-        scene=dict(xaxis_title="X", yaxis_title="Y", zaxis_title="Z"),
-        title="3D Visualization of Word Embeddings",
-        width=1000,  # Custom width
-        height=1000  # Custom height
-    )
-    
     # Optional: Show input
     with st.expander("📄 Show Input Sentences", expanded=False):
         for i, s in enumerate(sentences, 1):
             st.markdown(f"**Sentence {i}:** {s}")
 
-    st.plotly_chart(fig, use_container_width=True)
+    with perf.span("w2v.plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
     return fig, model
@@ -0,0 +1,242 @@
+import os
+import copy
+import json
+import hashlib
+import threading
+from collections import OrderedDict, Counter
+from concurrent.futures import ThreadPoolExecutor
+from gensim.models import Word2Vec
+from qa_utils.Word2Vec.projection import inherit_projection
+import perf
+
+# Memory budget for cached models (shared by every session in this process)
+MAX_CACHE_BYTES = int(os.environ.get("W2V_CACHE_MB", "256")) * 1024 * 1024
+# Total training threads shared by all models trained in one call
+TOTAL_WORKERS = int(os.environ.get("W2V_WORKERS", "4"))
+# When the input is a cached corpus plus appended lines, extend that model instead of retraining
+INCREMENTAL = os.environ.get("W2V_INCREMENTAL", "1") == "1"
+# Fall back to a full retrain once lines added incrementally exceed this share of the corpus,
+# or when the new lines bring in more new words than this share of the vocabulary
+MAX_DRIFT = 0.3
+MAX_NEW_WORDS = 0.3
+
+_cache = OrderedDict()  # key -> (model, nbytes, lineage)
+_cache_bytes = 0
+_lock = threading.Lock()
+_key_locks = {}
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "incremental": 0}
+
+def _update_digest(h, tokenized_sentences):
+    for sentence in tokenized_sentences:
+        h.update("\x1f".join(sentence).encode("utf-8"))
+        h.update(b"\x1e")
+
+def corpus_digest(tokenized_sentences):
+    h = hashlib.sha256()
+    _update_digest(h, tokenized_sentences)
+    return h.hexdigest()
+
+def _params_json(params):
+    return json.dumps(params, sort_keys=True)
+
+def _key(digest, params):
+    return hashlib.sha256(f"{digest}:{_params_json(params)}".encode("utf-8")).hexdigest()
+
+def corpus_key(tokenized_sentences, **params):
+    return _key(corpus_digest(tokenized_sentences), params)
+
+def _lineage(n_sentences, digest, params, drift=0):
+    # What a cached model was trained on, so a longer corpus with the same prefix can find it.
+    # `drift` counts the sentences added incrementally since the last full training
+    return {"params": _params_json(params), "n": n_sentences, "digest": digest, "drift": drift}
+
+def model_nbytes(model):
+    total = model.wv.vectors.nbytes
+    for name in ("syn1neg", "syn1"):
+        arr = getattr(model, name, None)
+        if arr is not None:
+            total += arr.nbytes
+    # Vocabulary dicts: rough per-word overhead
+    return total + len(model.wv.index_to_key) * 200
+
+def _put(key, model, lineage=None):
+    global _cache_bytes
+    nbytes = model_nbytes(model)
+    with _lock:
+        if key in _cache:
+            _cache_bytes -= _cache.pop(key)[1]
+        _cache[key] = (model, nbytes, lineage)
+        _cache_bytes += nbytes
+        # Evict least-recently-used models, but always keep the one just added
+        while _cache_bytes > MAX_CACHE_BYTES and len(_cache) > 1:
+            _, (_, evicted_bytes, _) = _cache.popitem(last=False)
+            _cache_bytes -= evicted_bytes
+            _stats["evictions"] += 1
+
+def _get(key):
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        _cache.move_to_end(key)
+        return entry[0]
+
+def train_word2vec_variants(tokenized_sentences, variants, total_workers=TOTAL_WORKERS):
+    """
+    Train one Word2Vec model per hyperparameter dict in `variants` on the same corpus.
+    The corpus is scanned for word counts once and every model builds its vocabulary from
+    those counts; the models then train concurrently (gensim releases the GIL while training),
+    splitting `total_workers` threads between them.
+    """
+    with perf.span("w2v.count_words"):
+        word_freq = Counter(word for sentence in tokenized_sentences for word in sentence)
+    workers = max(1, total_workers // len(variants))
+
+    def train(params):
+        model = Word2Vec(workers=workers, **params)
+        model.build_vocab_from_freq(word_freq, corpus_count=len(tokenized_sentences))
+        model.train(tokenized_sentences, total_examples=model.corpus_count, epochs=model.epochs)
+        return model
+
+    # Timed as a whole: with several variants the per-model times overlap
+    with perf.span("w2v.train"):
+        if len(variants) == 1:
+            return [train(variants[0])]
+        with ThreadPoolExecutor(max_workers=len(variants)) as executor:
+            return list(executor.map(train, variants))
+
+def _find_base(tokenized_sentences, params):
+    """The cached model with these parameters trained on the longest prefix of `tokenized_sentences`, or None."""
+    params_json = _params_json(params)
+    candidates = {}
+    with _lock:
+        for model, _, lineage in _cache.values():
+            if lineage and lineage["params"] == params_json and 0 < lineage["n"] < len(tokenized_sentences):
+                candidates.setdefault(lineage["n"], []).append((model, lineage))
+    best = None
+    h = hashlib.sha256()
+    hashed = 0
+    for n in sorted(candidates):
+        _update_digest(h, tokenized_sentences[hashed:n])
+        hashed = n
+        digest = h.hexdigest()
+        for model, lineage in candidates[n]:
+            if lineage["digest"] == digest:
+                best = (model, lineage)
+    return best
+
+def update_word2vec(base, new_sentences, workers=TOTAL_WORKERS):
+    """
+    Return a copy of `base` extended with `new_sentences`: their new words are added to the
+    vocabulary and training runs on the new sentences only. `base` is not modified (it may be shared).
+    The copy reuses the PCA basis of `base` for the embedding views, if it has one.
+    """
+    with perf.span("w2v.incremental_update"):
+        model = copy.deepcopy(base)
+        model.workers = workers
+        model.build_vocab(new_sentences, update=True)
+        model.train(new_sentences, total_examples=len(new_sentences), epochs=model.epochs)
+    # Keep the 2D/3D layout: new words are projected into the base model's PCA basis
+    inherit_projection(model, base)
+    return model
+
+def _train_incremental(tokenized_sentences, digest, params, workers):
+    # (model, lineage) when the corpus extends a cached one and is close enough to it, else None.
+    # lineage is None when the cached model is returned unchanged (nothing to add to the cache)
+    found = _find_base(tokenized_sentences, params)
+    if found is None:
+        return None
+    base, base_lineage = found
+    new_sentences = list(tokenized_sentences[base_lineage["n"]:])
+    drift = base_lineage["drift"] + len(new_sentences)
+    if drift > MAX_DRIFT * len(tokenized_sentences):
+        return None
+    new_words = {w for sentence in new_sentences for w in sentence if w not in base.wv.key_to_index}
+    if len(new_words) > MAX_NEW_WORDS * len(base.wv):
+        return None
+    if not any(new_sentences):
+        # Appended lines without any words leave the model as it is; it is already cached under its own key
+        return base, None
+    model = update_word2vec(base, new_sentences, workers)
+    return model, _lineage(len(tokenized_sentences), digest, params, drift)
+
+def get_word2vec_models(tokenized_sentences, variants, total_workers=TOTAL_WORKERS):
+    """
+    Cached version of train_word2vec_variants: returns one model per variant, in order,
+    training only the variants that are not cached yet. When the corpus is a cached one plus
+    appended sentences, that model is updated with the new sentences instead (see INCREMENTAL).
+    The returned models are shared: callers must not modify or retrain them.
+    """
+    variants = [dict(v) for v in variants]
+    digest = corpus_digest(tokenized_sentences)
+    keys = [_key(digest, v) for v in variants]
+    models = [_get(k) for k in keys]
+    missing = sorted({k for k, m in zip(keys, models) if m is None})
+
+    if missing:
+        # One lock per key so concurrent sessions asking for the same model train it once
+        with _lock:
+            key_locks = [_key_locks.setdefault(k, threading.Lock()) for k in missing]
+        for key_lock in key_locks:
+            key_lock.acquire()
+        try:
+            models = [_get(k) for k in keys]
+            to_train = {}
+            for k, v, m in zip(keys, variants, models):
+                if m is None:
+                    to_train[k] = v
+            built, reused = {}, {}
+            if INCREMENTAL and to_train:
+                workers = max(1, total_workers // len(to_train))
+                for k, v in list(to_train.items()):
+                    result = _train_incremental(tokenized_sentences, digest, v, workers)
+                    if result is None:
+                        continue
+                    if result[1] is None:
+                        reused[k] = result[0]
+                    else:
+                        _put(k, *result)
+                        built[k] = result[0]
+                    del to_train[k]
+            if to_train:
+                trained = train_word2vec_variants(tokenized_sentences, list(to_train.values()), total_workers)
+                for (k, v), model in zip(to_train.items(), trained):
+                    _put(k, model, _lineage(len(tokenized_sentences), digest, v))
+                    built[k] = model
+            models = [m if m is not None else built.get(k, reused.get(k)) for k, m in zip(keys, models)]
+        finally:
+            for key_lock in key_locks:
+                key_lock.release()
+            with _lock:
+                for k in missing:
+                    _key_locks.pop(k, None)
+    else:
+        to_train, built = {}, {}
+
+    with _lock:
+        _stats["misses"] += len(built)
+        _stats["incremental"] += len(built) - len(to_train)
+        _stats["hits"] += len(keys) - len(built)
+    perf.incr("w2v.cache_miss", len(to_train))
+    perf.incr("w2v.incremental_update", len(built) - len(to_train))
+    perf.incr("w2v.cache_hit", len(keys) - len(built))
+    return models
+
+def get_word2vec_model(tokenized_sentences, vector_size=100, window=5, min_count=1, sg=0, workers=TOTAL_WORKERS):
+    """
+    Return a trained Word2Vec model for this corpus and these hyperparameters,
+    training it only if no session in this process has trained the same one yet.
+    The returned model is shared: callers must not modify or retrain it.
+    """
+    params = {"vector_size": vector_size, "window": window, "min_count": min_count, "sg": sg}
+    return get_word2vec_models(tokenized_sentences, [params], total_workers=workers)[0]
+
+def get_cache_stats():
+    with _lock:
+        return dict(_stats, entries=len(_cache), size_bytes=_cache_bytes)
+
+def clear_cache():
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
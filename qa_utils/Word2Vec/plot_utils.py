@@ -0,0 +1,69 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+# Above this many words only the most frequent ones are plotted
+POINT_BUDGET = 5000
+# Only the most frequent words get a text label; the rest show their word on hover
+LABEL_BUDGET = 300
+# 2D plots switch from SVG Scatter to WebGL Scattergl above this many points
+WEBGL_THRESHOLD = 1000
+# Above this many sentences the sentence paths are merged into one trace
+MAX_SENTENCE_TRACES = 50
+
+def sentence_colors(n_sentences):
+    cmap = plt.get_cmap('tab20', n_sentences)
+    return ['#%02x%02x%02x' % (int(r*255), int(g*255), int(b*255)) for r, g, b, a in [cmap(i) for i in range(n_sentences)]]
+
+def first_sentence_index(tokenized_sentences, key_to_index):
+    """For every vocabulary word, the index of the first sentence containing it (-1 if none)."""
+    first = np.full(len(key_to_index), -1, dtype=np.int32)
+    seen = set()
+    for i, sentence in enumerate(tokenized_sentences):
+        for word in sentence:
+            if word not in seen:
+                seen.add(word)
+                idx = key_to_index.get(word)
+                if idx is not None:
+                    first[idx] = i
+    return first
+
+def word_colors(tokenized_sentences, key_to_index):
+    hex_colors = np.array(sentence_colors(len(tokenized_sentences)) + ['#888888'])
+    # -1 (word not in any sentence) picks the trailing grey
+    return hex_colors, hex_colors[first_sentence_index(tokenized_sentences, key_to_index)]
+
+def word_counts(keyed_vectors):
+    # Same values as keyed_vectors.get_vecattr(i, "count"), read as one array
+    return np.asarray(keyed_vectors.expandos["count"][:len(keyed_vectors)])
+
+def select_points(counts, point_budget=POINT_BUDGET):
+    """
+    Vocabulary indices of the (at most `point_budget`) most frequent words, most frequent first.
+    `index_to_key` itself is only sorted by frequency after a full training: an incremental
+    update appends its new words at the end whatever their counts.
+    """
+    # Stable: ties keep vocabulary order, as in a freshly trained model
+    return np.argsort(-np.asarray(counts), kind="stable")[:point_budget]
+
+def point_labels(words, label_budget=LABEL_BUDGET):
+    # `words` come most frequent first (see select_points)
+    labels = np.array(words, dtype=object)
+    labels[label_budget:] = ""
+    return labels
+
+def sentence_paths(tokenized_sentences, key_to_index, keep):
+    """Vocabulary indices of each sentence's words, restricted to the plotted points (`keep`)."""
+    kept = np.zeros(len(key_to_index) + 1, dtype=bool)  # the extra slot is -1 (unknown word)
+    kept[keep] = True
+    paths = []
+    for sentence in tokenized_sentences:
+        ids = np.fromiter((key_to_index.get(w, -1) for w in sentence), dtype=np.int64, count=len(sentence))
+        paths.append(ids[kept[ids]])
+    return paths
+
+def merged_path_coords(paths, reduced_vectors):
+    """Coordinates of all paths in one array, separated by NaN rows so they draw as one trace."""
+    if not paths:
+        return np.zeros((0, reduced_vectors.shape[1]))
+    sep = np.full((1, reduced_vectors.shape[1]), np.nan)
+    return np.concatenate([part for ids in paths for part in (reduced_vectors[ids], sep)])
@@ -0,0 +1,73 @@
+import threading
+import weakref
+import numpy as np
+import perf
+
+# Components computed per model: the 3D view uses all of them, the 2D view the first two
+N_COMPONENTS = 3
+# Vocabularies at least this large fit PCA with the randomized SVD solver instead of a full SVD
+RANDOMIZED_VOCAB = 20000
+
+_projections = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+class Projection:
+    """
+    PCA coordinates of a model's word vectors, computed once per model and shared by the
+    2D and 3D views. The basis (`mean`, `components`) can be reused for an updated model,
+    so words added incrementally land in the same layout as the existing ones.
+    """
+
+    def __init__(self, mean, components, coords):
+        self.mean = mean
+        self.components = components
+        self.coords = coords
+
+    @classmethod
+    def fit(cls, vectors, n_components=N_COMPONENTS):
+        """Fit PCA on `vectors` (rows follow `model.wv.index_to_key`)."""
+        from sklearn.decomposition import PCA
+
+        n_components = min(n_components, *vectors.shape)
+        solver = "randomized" if len(vectors) >= RANDOMIZED_VOCAB else "full"
+        pca = PCA(n_components=n_components, svd_solver=solver, random_state=0)
+        coords = pca.fit_transform(vectors).astype(np.float32)
+        return cls(pca.mean_.astype(np.float32), pca.components_.astype(np.float32), coords)
+
+    @classmethod
+    def from_basis(cls, basis, vectors):
+        """Project `vectors` onto the basis of another projection without refitting."""
+        return cls(basis.mean, basis.components, basis.transform(vectors))
+
+    def transform(self, vectors):
+        return (np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components.T
+
+def get_projection(model):
+    """
+    Return the cached Projection of `model`, fitting it on first use.
+    Models updated from a projected model (see `inherit_projection`) reuse its basis.
+    """
+    with _lock:
+        projection = _projections.get(model)
+    if projection is not None and len(projection.coords) == len(model.wv):
+        return projection
+    with perf.span("w2v.pca"):
+        if projection is None:
+            projection = Projection.fit(model.wv.vectors)
+        else:
+            # Inherited basis (or a stale one): only project, keep the layout
+            projection = Projection.from_basis(projection, model.wv.vectors)
+    with _lock:
+        _projections[model] = projection
+    return projection
+
+def inherit_projection(model, base):
+    """
+    Let `model` (an incremental update of `base`) reuse the basis of `base`'s projection, if
+    `base` has one. Its coordinates are computed lazily by `get_projection`.
+    """
+    with _lock:
+        projection = _projections.get(base)
+        if projection is not None:
+            # Basis only: the coordinates belong to `base`'s vectors
+            _projections[model] = Projection(projection.mean, projection.components, np.zeros((0, 0), np.float32))
@@ -0,0 +1,106 @@
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+import perf
+
+# Vocabularies at least this large store the normalized matrix as float16 (half the memory)
+HALF_PRECISION_VOCAB = 200000
+# Rows of the matrix multiplied per step; bounds the temporary float32 copy in half-precision mode
+CHUNK_ROWS = 65536
+
+_indexes = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+class SimilarityIndex:
+    """
+    Cosine top-k neighbours for a trained model's vectors, built once per model.
+    Rows are L2-normalized up front, so a batch of queries is a single matrix multiply
+    followed by `argpartition`.
+    """
+
+    def __init__(self, keyed_vectors, half_precision=False):
+        self.words = np.array(keyed_vectors.index_to_key, dtype=object)
+        self.key_to_index = keyed_vectors.key_to_index
+        matrix = np.asarray(keyed_vectors.vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+        self.matrix = matrix.astype(np.float16) if half_precision else matrix
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.key_to_index
+
+    def _scores(self, ids):
+        queries = self.matrix[ids].astype(np.float32)
+        if self.matrix.dtype == np.float32:
+            return queries @ self.matrix.T
+        scores = np.empty((len(ids), len(self.matrix)), dtype=np.float32)
+        for start in range(0, len(self.matrix), CHUNK_ROWS):
+            block = self.matrix[start:start + CHUNK_ROWS].astype(np.float32)
+            scores[:, start:start + CHUNK_ROWS] = queries @ block.T
+        return scores
+
+    def top_k(self, words, topn=5):
+        """
+        Args:
+            words (list[str]): Query words; all must be in the vocabulary.
+            topn (int): Neighbours per query word (the word itself is excluded).
+        Returns:
+            indices (np.ndarray): (len(words), k) vocabulary indices, best first.
+            scores (np.ndarray): (len(words), k) cosine similarities.
+        """
+        ids = np.array([self.key_to_index[w] for w in words], dtype=np.int64)
+        k = min(topn, len(self.words) - 1)
+        if len(ids) == 0 or k <= 0:
+            return np.zeros((len(ids), 0), dtype=np.int64), np.zeros((len(ids), 0), dtype=np.float32)
+
+        with perf.span("w2v.similarity_query"):
+            scores = self._scores(ids)
+            scores[np.arange(len(ids)), ids] = -np.inf
+            part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            part_scores = np.take_along_axis(scores, part, axis=1)
+            order = np.argsort(-part_scores, axis=1, kind="stable")
+            return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+    def most_similar(self, words, topn=5):
+        """Like `model.wv.most_similar` for a batch: `{word: [(neighbour, similarity), ...]}`."""
+        indices, scores = self.top_k(words, topn)
+        return {
+            w: list(zip(self.words[idx].tolist(), sc.astype(float).tolist()))
+            for w, idx, sc in zip(words, indices, scores)
+        }
+
+def get_similarity_index(model, half_precision=None):
+    """Similarity index for a trained model, built on first use and kept as long as the model is alive."""
+    if half_precision is None:
+        half_precision = len(model.wv) >= HALF_PRECISION_VOCAB
+    with _lock:
+        index = _indexes.get(model)
+        if index is not None and (index.matrix.dtype == np.float16) == half_precision:
+            return index
+    with perf.span("w2v.similarity_index"):
+        index = SimilarityIndex(model.wv, half_precision=half_precision)
+    with _lock:
+        _indexes[model] = index
+    return index
+
+def parse_query_words(text):
+    """Split a comma-separated query box into words, keeping order and dropping duplicates."""
+    return list(dict.fromkeys(w.strip() for w in text.split(",") if w.strip()))
+
+def compare_neighbour_table(left, right, words, topn=5, left_name="Skip-gram", right_name="CBOW"):
+    """Side-by-side top-k neighbours of every query word under two models."""
+    left_idx, left_scores = left.top_k(words, topn)
+    right_idx, right_scores = right.top_k(words, topn)
+    k = min(left_idx.shape[1], right_idx.shape[1])
+    return pd.DataFrame({
+        "Word": np.repeat(np.array(words, dtype=object), k),
+        "Rank": np.tile(np.arange(1, k + 1), len(words)),
+        left_name: left.words[left_idx[:, :k]].ravel(),
+        f"{left_name} sim": left_scores[:, :k].ravel(),
+        right_name: right.words[right_idx[:, :k]].ravel(),
+        f"{right_name} sim": right_scores[:, :k].ravel(),
+    })
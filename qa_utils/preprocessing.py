@@ -0,0 +1,98 @@
+import os
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from gensim.utils import simple_preprocess
+from gensim.parsing.preprocessing import remove_stopwords
+import perf
+
+# Tokenized sentences remembered per process (shared by every Word2Vec view and session)
+MEMO_SIZE = 100000
+# Above this many uncached sentences, tokenization is spread over a process pool
+BATCH_THRESHOLD = 20000
+BATCH_SIZE = 5000
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+def _tokenize(sentence, remove_stop):
+    if remove_stop:
+        sentence = remove_stopwords(sentence)
+    return simple_preprocess(sentence)
+
+def _tokenize_batch(sentences, remove_stop):
+    return [_tokenize(s, remove_stop) for s in sentences]
+
+def _tokenize_parallel(sentences, remove_stop, batch_size):
+    chunks = [sentences[i:i + batch_size] for i in range(0, len(sentences), batch_size)]
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(len(chunks), os.cpu_count() or 1), mp_context=ctx) as executor:
+        results = executor.map(_tokenize_batch, chunks, [remove_stop] * len(chunks))
+        return [tokens for chunk in results for tokens in chunk]
+
+def tokenize_sentences(sentences, remove_stop=True, batch=None, batch_size=BATCH_SIZE):
+    """
+    Tokenize raw sentences with `simple_preprocess` (after `remove_stopwords` when `remove_stop`).
+    Each distinct sentence is tokenized once per process; unchanged lines are served from the memo.
+    Args:
+        sentences (list[str]): Raw sentences, one per line.
+        remove_stop (bool): Drop gensim stopwords before tokenizing.
+        batch (bool): Tokenize uncached sentences on a process pool. Defaults to doing so
+            only when more than `BATCH_THRESHOLD` sentences are uncached.
+        batch_size (int): Sentences per pool task.
+    Returns:
+        list[list[str]]: Tokens of each sentence, in input order.
+    """
+    results = [None] * len(sentences)
+    missing = {}
+    with _memo_lock:
+        for i, sentence in enumerate(sentences):
+            tokens = _memo.get((sentence, remove_stop))
+            if tokens is None:
+                missing.setdefault(sentence, []).append(i)
+            else:
+                _memo.move_to_end((sentence, remove_stop))
+                results[i] = tokens
+
+    if missing:
+        todo = list(missing)
+        if batch is None:
+            batch = len(todo) > BATCH_THRESHOLD
+        with perf.span("w2v.tokenize"):
+            if batch and len(todo) > batch_size:
+                tokenized = _tokenize_parallel(todo, remove_stop, batch_size)
+            else:
+                tokenized = _tokenize_batch(todo, remove_stop)
+
+        with _memo_lock:
+            for sentence, tokens in zip(todo, tokenized):
+                tokens = tuple(tokens)
+                _memo[(sentence, remove_stop)] = tokens
+                for i in missing[sentence]:
+                    results[i] = tokens
+            while len(_memo) > MEMO_SIZE:
+                _memo.popitem(last=False)
+
+    return [list(tokens) for tokens in results]
+
+def to_id_arrays(tokenized_sentences, vocab=None):
+    """
+    Encode tokenized sentences as integer-ID arrays.
+    Args:
+        tokenized_sentences (list[list[str]]): Output of tokenize_sentences.
+        vocab (dict[str, int]): Existing word -> id mapping to extend; a new one is created when None.
+    Returns:
+        id_arrays (list[np.ndarray]): One int32 array per sentence.
+        vocab (dict[str, int]): Word -> id mapping (ids in order of first appearance).
+    """
+    vocab = {} if vocab is None else vocab
+    id_arrays = []
+    for tokens in tokenized_sentences:
+        id_arrays.append(np.fromiter((vocab.setdefault(t, len(vocab)) for t in tokens), dtype=np.int32, count=len(tokens)))
+    return id_arrays, vocab
+
+def clear_memo():
+    with _memo_lock:
+        _memo.clear()
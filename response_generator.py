@@ -1,49 +1,94 @@
 from pdf_context import *
 from qa_utils import *
+from pdf_search import search_pdf
+from pdf_clustering import clustering_summary
+from esg_analysis import esg_summary, esg_heatmap_data, get_esg_scores
+from content_store import make_content_ref, message_text
 import re
+import perf
+
+SHOW_CONTENT_PREFIX = """
+        🤖 Here's what I found from the uploaded PDF:\n
+        """
+SHOW_CONTENT_SUFFIX = """
+        ----------------------------------\n
+        """
 
 def generate_response(prompt):
-    pdf_context = get_pdf_context()
+    doc = get_pdf_document()
+    return message_text(generate_response_message(prompt), {doc.key: doc} if doc is not None else None)
+
+def generate_response_message(prompt):
+    """
+    Answer `prompt` as an assistant chat message. Answers that quote the PDF store a
+    `content_ref` to the parsed document instead of a copy of its text (see content_store).
+    """
+    with perf.span("response.generate"):
+        response = _respond(prompt)
+    if isinstance(response, dict) and "role" in response:
+        # Already a complete message (e.g. with chart data)
+        return response
+    if isinstance(response, dict):
+        return {"role": "assistant", "content_ref": response}
+    return {"role": "assistant", "content": response}
+
+def _with_tables(doc):
+    # Whole-document answers include tables: parse the ones deferred at upload first
+    doc.load_tables()
+    return doc
+
+def _respond(prompt):
     original_prompt = prompt
     prompt = prompt.strip().lower()
 
-    if prompt not in ["show content", "clustering analysis", "esg analysis"] and "show pdf page" not in prompt:
+    if prompt not in ["show content", "clustering analysis", "esg analysis"] and "show pdf page" not in prompt and prompt.split(" ")[0] != "search":
         return (
             "📝 It looks like your prompt might not match the expected operations.\n\n"
             "💡 Try entering prompts like:\n"
             "- Show content\n"
             "- Show pdf page <num>\n"
+            "- Search <terms>\n"
             "- Clustering analysis\n"
             "- ESG analysis\n\n"
             "📄 Also, make sure you've uploaded a PDF file first!"
         )
 
-    if not pdf_context:
+    if not has_pdf_context():
         return f"Please upload a PDF file to get context."
     elif prompt == "show content":
-        # {pdf_context[:1000]}
-        return f"""
-        🤖 Here's what I found from the uploaded PDF:\n
-        {pdf_context}
-        ----------------------------------\n
-        """
+        if get_ingest_status():
+            # Still parsing: answer with what is there now rather than a reference that keeps growing
+            return SHOW_CONTENT_PREFIX + get_pdf_context() + SHOW_CONTENT_SUFFIX
+        with perf.span("response.show_content"):
+            return make_content_ref(_with_tables(get_pdf_document()), prefix=SHOW_CONTENT_PREFIX, suffix=SHOW_CONTENT_SUFFIX)
     elif "show pdf page" in prompt:
         match = re.search(r"show pdf page (\d+)", prompt)
         if match:
             page_number = int(match.group(1))
+            doc = get_pdf_document()
+            if page_number in doc:
+                doc.load_tables([page_number])
+                return make_content_ref(doc, start=page_number, end=page_number)
             return get_pdf_context(page=page_number)
         else:
             return "⚠️ Please specify the page number, e.g., `Show PDF page 2`."
+    elif prompt.split(" ")[0] == "search":
+        query = prompt[len("search"):].strip()
+        if not query:
+            return "⚠️ Please specify what to search for, e.g., `Search carbon emissions`."
+        with perf.span("response.search"):
+            return search_pdf(get_pdf_document(), query)
     elif prompt == "clustering analysis":
-
-        # "colab code"
-
-        return f"📊 Working on clustering analysis..."
+        with perf.span("response.clustering"):
+            return clustering_summary(_with_tables(get_pdf_document()))
     elif prompt == "esg analysis":
-
-        # "colab code"
-
-        return f"🌱 Working on ESG analysis..."
+        with perf.span("response.esg"):
+            doc = _with_tables(get_pdf_document())
+            message = {"role": "assistant", "content": esg_summary(doc)}
+            if get_esg_scores(doc)["doc_counts"].any():
+                # Rendered as a page x category heatmap under the summary
+                message["esg_heatmap"] = esg_heatmap_data(doc)
+            return message
 
     # 加一個 fallback return，防止漏掉時回傳 None
     return f"⚠️ Unexpected issue of prompt - ```{original_prompt}```. Please try again."
\ No newline at end of file
@@ -0,0 +1,29 @@
+import math
+import time
+
+# Longest a response animation may take, whatever its size
+STREAM_TIME_BUDGET = 3.0
+# Delay between words for short responses (the original typing speed)
+WORD_DELAY = 0.15
+# Responses longer than this (characters) are shown at once without animation
+INSTANT_THRESHOLD = 20000
+
+def stream_text(text, time_budget=STREAM_TIME_BUDGET, word_delay=WORD_DELAY,
+                instant_threshold=INSTANT_THRESHOLD, sleep=time.sleep):
+    """
+    Yield `text` word-chunk by word-chunk so the whole animation fits in `time_budget` seconds.
+    Short texts stream one word per `word_delay`; longer ones grow the chunk size instead of
+    the total time.
+    """
+    if len(text) > instant_threshold:
+        yield text
+        return
+
+    words = text.split(" ")
+    n_chunks = max(1, min(len(words), int(time_budget / word_delay)))
+    chunk_size = math.ceil(len(words) / n_chunks)
+    delay = min(word_delay, time_budget / n_chunks)
+
+    for start in range(0, len(words), chunk_size):
+        yield " ".join(words[start:start + chunk_size]) + " "
+        sleep(delay)
@@ -1,31 +1,41 @@
+import importlib
 import streamlit as st
-from openai import OpenAI
-import time
-import requests
 from db_utils import init_db, get_user_profile, save_user_profile
-from qa_utils.Word2Vec import SKIPGRAM, View2D, View3D, CBOW, CompareSkipgramCBOW
 from ui_utils import *
 from pdf_context import *
-from response_generator import generate_response
+from response_generator import generate_response_message
+from content_store import message_text
+from url_utils import image_url_validator
+from stream_utils import stream_text
+import perf
 
 placeholderstr = "Please input your command"
 # user_name = "Claire"
 # user_image = "https://www.w3schools.com/howto/img_avatar.png"
 
+# Sidebar task -> (module, function). These modules pull in gensim, scikit-learn and plotly,
+# so each one is imported when its task is first used and then stays loaded for the process
+WORD2VEC_TASKS = {
+    "2D View": ("qa_utils.Word2Vec.View2D", "plot_word2vec_2d"),
+    "3D View": ("qa_utils.Word2Vec.View3D", "plot_word2vec_3d"),
+    "SKIP-GRAM": ("qa_utils.Word2Vec.SKIPGRAM", "plot_skipgram_word2vec"),
+    "CBOW": ("qa_utils.Word2Vec.CBOW", "plot_cbow_word2vec"),
+    "Compare Skip-gram vs CBOW": ("qa_utils.Word2Vec.CompareSkipgramCBOW", "compare_skipgram_cbow"),
+}
+
+def load_task(task):
+    module_name, function_name = WORD2VEC_TASKS[task]
+    with perf.span("app.load_task_module"):
+        module = importlib.import_module(module_name)
+    return getattr(module, function_name)
+
 def stream_data(stream_str):
-    for word in stream_str.split(" "):
-        yield word + " "
-        time.sleep(0.15)
+    # A new prompt reruns the script, which abandons this animation; the full reply is already in the history
+    return stream_text(stream_str)
 
 def is_valid_image_url(url):
-    try:
-        response = requests.get(url, timeout=2)
-        if response.status_code == 200 and 'image' in response.headers["Content-Type"]:
-            return True
-        else:
-            return False
-    except:
-        return False
+    # Never blocks on the network: None while the first check of this URL is still running
+    return image_url_validator.check(url)
 
 def main():
     st.set_page_config(
@@ -40,9 +50,10 @@ def main():
         page_icon="img/favicon.ico"
     )
 
-    # Get User Profile from db
+    # Get User Profile from db (one profile per visitor, see current_user_key)
     init_db()
-    profile = get_user_profile()
+    user_key = current_user_key()
+    profile = get_user_profile(user_key)
 
     if "user_name" not in st.session_state:
         st.session_state["user_name"] = profile["user_name"] if profile else "Brian"
@@ -58,9 +69,13 @@ def main():
     with st.sidebar:
         st_c_1 = st.container(border=True)
         with st_c_1:
+            image_ok = is_valid_image_url(user_image) if user_image else False
             if user_image:
-                if is_valid_image_url(user_image):
+                if image_ok:
                     st.image(user_image)
+                elif image_ok is None:
+                    # Still checking the URL: show the default image for now
+                    st.image("https://www.w3schools.com/howto/img_avatar.png")
                 else:
                     # st.warning("⚠️ Invalid avatar URL. Showing default image.")
                     # show_dismissible_alert("⚠️ Invalid avatar URL. Showing default image.<br>Image Ref: https://unsplash.com/", alert_type="warning")
@@ -82,6 +97,7 @@ def main():
             "CBOW",
             "Compare Skip-gram vs CBOW"
         ])
+        perf.name_request(task)
 
         st.markdown("---")
         # st.write("🌐 Language")
@@ -96,49 +112,48 @@ def main():
                 submitted = st.form_submit_button("💾 Save Profile")
 
                 if submitted:
-                    save_user_profile(new_name, new_image)
+                    save_user_profile(new_name, new_image, user_key)
+                    image_url_validator.check(new_image)  # start checking the new avatar right away
                     st.session_state["user_name"] = new_name
                     st.session_state["user_image"] = new_image
                     st.success("Profile saved! Please refresh to see changes.")
                     st.rerun()
 
+        session_memory_section()
+        performance_section()
+
     st_c_chat = st.container(border=True)
     pdf_upload_section()
 
     if "messages" not in st.session_state:
         st.session_state.messages = []
     else:
-        for msg in st.session_state.messages:
-            if msg["role"] == "user":
-                if user_image:
-                    st_c_chat.chat_message(msg["role"],avatar=user_image).markdown((msg["content"]))
-                else:
-                    st_c_chat.chat_message(msg["role"]).markdown((msg["content"]))
-            elif msg["role"] == "assistant":
-                st_c_chat.chat_message(msg["role"]).markdown((msg["content"]))
-            else:
-                try:
-                    image_tmp = msg.get("image")
-                    if image_tmp:
-                        st_c_chat.chat_message(msg["role"],avatar=image_tmp).markdown((msg["content"]))
-                except:
-                    st_c_chat.chat_message(msg["role"]).markdown((msg["content"]))
+        render_chat_history(st_c_chat, st.session_state.messages, user_image)
 
     # Chat function section (timing included inside function)
     def chat(prompt: str):
-        if user_image and is_valid_image_url(user_image):
+        if user_image and image_ok:
             chat_user_image = user_image
         else:
             chat_user_image = "https://www.w3schools.com/howto/img_avatar.png"
+        perf.name_request("chat")
         st_c_chat.chat_message("user", avatar=chat_user_image).write(prompt)
         st.session_state.messages.append({"role": "user", "content": prompt})
 
         # Call generate_response function
-        response = generate_response(prompt)
+        message = generate_response_message(prompt)
         # response = f"You type: {prompt}"
 
-        st.session_state.messages.append({"role": "assistant", "content": response})
-        st_c_chat.chat_message("assistant").write_stream(stream_data(response))
+        if "content_ref" in message:
+            # History keeps a reference to the parsed PDF instead of a copy of its text
+            doc = get_pdf_document()
+            st.session_state.setdefault("message_docs", {})[doc.key] = doc
+        st.session_state.messages.append(message)
+        # The document may still be parsing and not in the content store yet
+        response = message_text(message, st.session_state.get("message_docs"))
+        assistant = st_c_chat.chat_message("assistant")
+        assistant.write_stream(stream_data(response))
+        render_message_charts(assistant, message, len(st.session_state.messages) - 1)
 
     st.markdown("---")
     if task == "General Chatbot 🤖":
@@ -154,20 +169,9 @@ def main():
 
         # 🧭 Routing logic
         if user_sentences:
-            if task == "2D View":
-                fig, model = View2D.plot_word2vec_2d(user_sentences)
-
-            elif task == "3D View":
-                fig, model = View3D.plot_word2vec_3d(user_sentences)
-
-            elif task == "SKIP-GRAM":
-                fig, model = SKIPGRAM.plot_skipgram_word2vec(user_sentences)
-
-            elif task == "CBOW":
-                fig, model = CBOW.plot_cbow_word2vec(user_sentences)
-            
-            elif task == "Compare Skip-gram vs CBOW":
-                fig, model = CompareSkipgramCBOW.compare_skipgram_cbow(user_sentences)
+            fig, model = load_task(task)(user_sentences)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # One request per script rerun; named after the task once main() knows it
+    with perf.request("rerun", session_id()):
+        main()
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Checks for the avatar URL validator against a local stand-in HTTP server:
+
+    python -m pytest tests
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from url_utils import ImageUrlValidator, probe_image_url
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class ImageHandler(BaseHTTPRequestHandler):
+    # path -> (HEAD status, GET status, Content-Type)
+    routes = {
+        "/avatar.png": (200, 200, "image/png"),
+        "/page.html": (200, 200, "text/html"),
+        "/no-head.png": (405, 200, "image/png"),
+        "/slow.png": (200, 200, "image/png"),
+    }
+
+    def _respond(self, head):
+        self.server.hits.append((self.command, self.path))
+        if self.path == "/slow.png":
+            self.server.release.wait(5)
+        route = self.routes.get(self.path)
+        if route is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        status = route[0] if head else route[1]
+        self.send_response(status)
+        if status == 200:
+            self.send_header("Content-Type", route[2])
+            self.send_header("Content-Length", "4")
+        self.end_headers()
+        if not head and status == 200:
+            self.wfile.write(b"\x89PNG")
+
+    def do_HEAD(self):
+        self._respond(head=True)
+
+    def do_GET(self):
+        self._respond(head=False)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    httpd.hits = []
+    httpd.release = threading.Event()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.release.set()
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_probe_accepts_image(server):
+    assert probe_image_url(server.url + "/avatar.png") is True
+    assert server.hits == [("HEAD", "/avatar.png")]
+
+def test_probe_rejects_non_image_and_bad_host(server):
+    assert probe_image_url(server.url + "/page.html") is False
+    assert probe_image_url(server.url + "/missing.png") is False
+    # Nothing listens on port 1
+    assert probe_image_url("http://127.0.0.1:1/avatar.png", timeout=1) is False
+
+def test_probe_falls_back_to_get_when_head_is_rejected(server):
+    assert probe_image_url(server.url + "/no-head.png") is True
+    assert server.hits == [("HEAD", "/no-head.png"), ("GET", "/no-head.png")]
+
+def test_invalid_result_is_cached_for_negative_ttl(server):
+    clock = FakeClock()
+    validator = ImageUrlValidator(ttl=3600, negative_ttl=300, clock=clock)
+    url = server.url + "/page.html"
+
+    assert validator.check(url, wait=True) is False
+    assert validator.check(url) is False
+    assert len(server.hits) == 1
+
+    # Once expired, the stale result is still returned while it is probed again
+    clock.now = 301
+    assert validator.check(url) is False
+    assert validator.check(url, wait=True) is False
+    assert len(server.hits) == 2
+
+def test_check_returns_none_while_probe_is_pending(server):
+    validator = ImageUrlValidator()
+    url = server.url + "/slow.png"
+
+    assert validator.check(url) is None
+    assert validator.check(url) is None  # still the same probe
+    server.release.set()
+    assert validator.check(url, wait=True) is True
+    assert validator.check(url) is True
+    assert server.hits == [("HEAD", "/slow.png")]
@@ -1,6 +1,37 @@
-import fitz  # PyMuPDF
+import os
+import uuid
 import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from pdf_context import *
+from pdf_cache import get_cached_extraction, put_cached_extraction
+from pdf_batch import load_artifact
+from content_store import register_document, lookup_document, message_length, message_text, session_memory_stats
+from db_utils import DEFAULT_USER
+import perf
+
+# Anonymous visitors share the DEFAULT_USER profile only when this is set (e.g. a single-user local run)
+SHARED_PROFILE = os.environ.get("SHARED_PROFILE", "0") == "1"
+# Prefix of profile keys that come from a signed-in account; never accepted from the URL
+AUTH_KEY_PREFIX = "auth:"
+
+# user profile key
+def current_user_key():
+    """
+    Profile key of this visitor: the signed-in account when authentication is configured (st.login),
+    else `?user=<key>` from the URL. A visitor without either gets a new random key, written to the
+    URL so the same profile comes back on reload or from a bookmark.
+    """
+    if st.user.get("is_logged_in"):
+        return AUTH_KEY_PREFIX + (st.user.get("email") or st.user.get("sub"))
+    user_key = st.query_params.get("user")
+    if user_key and not user_key.startswith(AUTH_KEY_PREFIX):
+        return user_key
+    if SHARED_PROFILE:
+        return DEFAULT_USER
+    user_key = st.session_state.setdefault("user_key", uuid.uuid4().hex)
+    st.query_params["user"] = user_key
+    return user_key
 
 # pdf upload section
 def pdf_upload_section():
@@ -9,17 +40,206 @@ def pdf_upload_section():
 
         # 若已解析 pdf 就不要重複執行
         if uploaded_file and "pdf_text" not in st.session_state:
-            doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-            extracted = extract_text_by_page(doc, max_pages=len(doc))
-            st.session_state["pdf_text"] = extracted
+            # 上傳檔案分段寫入暫存檔（同時計算 hash），不在記憶體中保留整份 PDF
+            with perf.span("ui.pdf_spool"):
+                pdf_path, pdf_hash = spool_upload(uploaded_file)
+            with open_pdf(pdf_path) as doc:
+                params = {"max_pages": len(doc), "skip_pages": [], "lazy_tables": LAZY_TABLES}
+
+            # 其他 session 已載入同一份檔案就共用，其次使用批次解析的結果（pdf_batch.py），再來是快取
+            with perf.span("ui.pdf_cache_lookup"):
+                shared = lookup_document(pdf_hash)
+                artifact = load_artifact(pdf_hash) if shared is None else None
+                extracted = get_cached_extraction(pdf_hash, **params) if shared is None and artifact is None else None
+            if shared is not None:
+                perf.incr("pdf.shared_hit")
+                discard_file(pdf_path)
+                st.session_state["pdf_text"] = shared
+            elif artifact is not None:
+                # Batch artifacts are complete (tables included), so the upload is not needed
+                perf.incr("pdf.artifact_hit")
+                discard_file(pdf_path)
+                st.session_state["pdf_text"] = register_document(PdfDocument(artifact, file_hash=pdf_hash))
+            elif extracted is not None:
+                perf.incr("pdf.cache_hit")
+                if not LAZY_TABLES:
+                    discard_file(pdf_path)
+                st.session_state["pdf_text"] = register_document(PdfDocument(
+                    extracted, file_hash=pdf_hash, source=pdf_path if LAZY_TABLES else None, owns_source=True
+                ))
+            else:
+                perf.incr("pdf.cache_miss")
+                def on_complete(document):
+                    # Spilled documents are too large to serialize into the cache in one piece
+                    if not document.spilled:
+                        put_cached_extraction(pdf_hash, document.pages, **params)
+                    register_document(document)
+
+                # 背景解析，每解析完一頁就能在聊天中使用
+                job = PdfIngestJob(
+                    pdf_path,
+                    workers=PDF_WORKERS,
+                    file_hash=pdf_hash,
+                    on_complete=on_complete,
+                    owns_source=True,
+                    **params
+                ).start()
+                st.session_state["pdf_ingest"] = job
+                st.session_state["pdf_text"] = job.document
+
+        if "pdf_ingest" in st.session_state:
+            pdf_ingest_progress()
+        elif "pdf_text" in st.session_state and uploaded_file:
             st.success("✅ PDF uploaded and parsed successfully!")
 
         # Clear button
         if "pdf_text" in st.session_state:
             if st.button("🗑️ Clear PDF"):
+                job = st.session_state.pop("pdf_ingest", None)
+                if job:
+                    job.cancel()
                 del st.session_state["pdf_text"]
                 st.rerun()
 
+# Re-runs on its own every second while the background parse is going
+@st.fragment(run_every=1)
+def pdf_ingest_progress():
+    job = st.session_state.get("pdf_ingest")
+    if job is None:
+        return
+    if job.error:
+        st.error(f"❌ Failed to parse PDF: {job.error}")
+    elif not job.done:
+        st.progress(job.progress, text=f"Parsing PDF... {len(job.document)}/{job.total_pages} pages ready")
+    else:
+        del st.session_state["pdf_ingest"]
+        st.rerun()
+
+# chat history section
+HISTORY_RECENT = 10       # messages rendered in full at the bottom of the chat
+HISTORY_PAGE_SIZE = 20    # older messages are browsed in pages of this size
+MESSAGE_MAX_CHARS = 4000  # longer assistant messages are truncated until expanded
+
+def render_message(container, msg, index, user_image=None, max_chars=MESSAGE_MAX_CHARS, docs=None):
+    if msg["role"] == "user":
+        chat = container.chat_message(msg["role"], avatar=user_image) if user_image else container.chat_message(msg["role"])
+    elif msg["role"] == "assistant":
+        chat = container.chat_message(msg["role"])
+    else:
+        image_tmp = msg.get("image")
+        chat = container.chat_message(msg["role"], avatar=image_tmp) if image_tmp else container.chat_message(msg["role"])
+
+    # Messages may only reference PDF text; it is materialized here, and only as much as is shown
+    length = message_length(msg, docs)
+    if msg["role"] != "assistant" or length <= max_chars:
+        chat.markdown(message_text(msg, docs))
+    else:
+        # Oversized answers (e.g. "show content") are only sent to the browser in full on request
+        expanded = chat.toggle(f"Show full message ({length:,} characters)", key=f"expand_msg_{index}")
+        chat.markdown(message_text(msg, docs) if expanded else message_text(msg, docs, max_chars=max_chars) + " …")
+    render_message_charts(chat, msg, index)
+
+def render_message_charts(chat, msg, index):
+    # Chart data stored with an answer (e.g. "esg analysis"), drawn under its text
+    if "esg_heatmap" in msg:
+        from esg_analysis import esg_heatmap_figure
+        chat.plotly_chart(esg_heatmap_figure(msg["esg_heatmap"]), use_container_width=True, key=f"esg_heatmap_{index}")
+
+def render_chat_history(container, messages, user_image=None,
+                        recent=HISTORY_RECENT, page_size=HISTORY_PAGE_SIZE, max_chars=MESSAGE_MAX_CHARS):
+    """
+    Render the last `recent` messages; older ones are hidden behind a page selector so a
+    rerun costs the same however long the conversation gets.
+    """
+    with perf.span("ui.render_history"):
+        _render_chat_history(container, messages, user_image, recent, page_size, max_chars)
+
+def _render_chat_history(container, messages, user_image, recent, page_size, max_chars):
+    docs = st.session_state.get("message_docs")
+    n_older = max(0, len(messages) - recent)
+    if n_older:
+        pages = [(start, min(start + page_size, n_older)) for start in range(0, n_older, page_size)]
+        labels = ["Hidden"] + [f"Messages {a + 1}–{b}" for a, b in pages]
+        choice = container.selectbox(
+            f"📜 {n_older} earlier message(s)", range(len(labels)),
+            format_func=lambda i: labels[i], key="history_page"
+        )
+        if choice:
+            start, end = pages[choice - 1]
+            for i in range(start, end):
+                render_message(container, messages[i], i, user_image, max_chars, docs)
+            container.markdown("---")
+
+    for i in range(n_older, len(messages)):
+        render_message(container, messages[i], i, user_image, max_chars, docs)
+
+# session memory section
+def session_memory_section():
+    stats = session_memory_stats(
+        st.session_state.get("messages", []),
+        st.session_state.get("message_docs"),
+        st.session_state.get("pdf_text"),
+    )
+    with st.expander("🧮 Session memory", expanded=False):
+        st.caption(
+            f"Messages: {stats['messages']} ({stats['ref_messages']} referencing the PDF)  \n"
+            f"Inline message text: {stats['inline_bytes'] / 1024:,.1f} KB  \n"
+            f"PDF text held: {stats['document_bytes'] / 1024:,.1f} KB in {stats['documents']} document(s)  \n"
+            f"Referenced, not copied: {stats['referenced_chars']:,} characters"
+        )
+
+# performance debug section
+PERF_PANEL_REQUESTS = 10  # recent requests listed in the panel
+
+def session_id():
+    # Tags perf requests so the performance panel only shows this session's own requests
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+def _forget_ended_sessions():
+    # Sessions closed since the last check no longer keep records or recording on
+    if not runtime.exists():
+        return
+    instance = runtime.get_instance()
+    for session in perf.sessions():
+        if session is not None and not instance.is_active_session(session):
+            perf.forget_session(session)
+
+def performance_section():
+    # Each session decides whether it sees the panel; recording runs while any session has it open
+    enabled = st.toggle("⏱️ Performance panel", value=False, key="perf_enabled")
+    session = session_id()
+    perf.watch(session, enabled)
+    _forget_ended_sessions()
+    if not enabled:
+        return
+
+    import pandas as pd
+
+    with st.expander("⏱️ Performance", expanded=True):
+        requests = perf.recent_requests(session)[:PERF_PANEL_REQUESTS]
+        if not requests:
+            st.caption("No requests recorded yet; interact with the app and they will show up here.")
+        else:
+            st.dataframe(pd.DataFrame([
+                {"request": r["name"], "total (ms)": round(r["duration_s"] * 1000, 1)} for r in requests
+            ]), hide_index=True, use_container_width=True)
+
+            labels = [f"{i + 1}. {r['name']}" for i, r in enumerate(requests)]
+            choice = st.selectbox("Stage breakdown", range(len(requests)), format_func=lambda i: labels[i], key="perf_request")
+            stages = sorted(requests[choice]["stages"].items(), key=lambda kv: -kv[1][0])
+            if stages:
+                st.dataframe(pd.DataFrame([
+                    {"stage": name, "ms": round(total * 1000, 2), "calls": calls} for name, (total, calls) in stages
+                ]), hide_index=True, use_container_width=True)
+            else:
+                st.caption("No instrumented stages ran in this request.")
+
+        col_1, col_2 = st.columns(2)
+        # Prometheus metrics are per-stage aggregates for the whole process; the JSONL has this session's requests
+        col_1.download_button("Prometheus", perf.export_prometheus(), file_name="metrics.prom", mime="text/plain")
+        col_2.download_button("JSONL", perf.export_jsonl(session), file_name="requests.jsonl", mime="application/x-ndjson")
+
 # alert section
 def show_dismissible_alert(key: str, text: str, alert_type="warning"):
     colors = {
@@ -0,0 +1,83 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# How long a probe result is trusted
+VALID_TTL = 60 * 60
+INVALID_TTL = 5 * 60
+PROBE_TIMEOUT = 2
+
+def probe_image_url(url, timeout=PROBE_TIMEOUT):
+    """Check that `url` serves an image without downloading the body."""
+    # Imported here: probes run on background threads, so the import stays off the first page load
+    import requests
+
+    try:
+        response = requests.head(url, timeout=timeout, allow_redirects=True)
+        content_type = response.headers.get("Content-Type", "")
+        if response.status_code == 200 and content_type:
+            return "image" in content_type
+        if response.status_code in (403, 405, 501) or (response.status_code == 200 and not content_type):
+            # Some hosts reject HEAD: fall back to GET but only read the response headers
+            with requests.get(url, timeout=timeout, stream=True) as response:
+                return response.status_code == 200 and "image" in response.headers.get("Content-Type", "")
+        return False
+    except requests.RequestException:
+        return False
+
+class ImageUrlValidator:
+    """
+    TTL cache of image URL checks (valid and invalid results) with probes run on background threads,
+    so callers never wait on the network.
+    """
+
+    def __init__(self, probe=probe_image_url, ttl=VALID_TTL, negative_ttl=INVALID_TTL, max_workers=4, clock=time.monotonic):
+        self.probe = probe
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._results = {}  # url -> (is_valid, expires_at)
+        self._pending = {}  # url -> Future
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-url-check")
+
+    def check(self, url, wait=False):
+        """
+        Returns:
+            bool | None: cached result, or None while the first probe for `url` is still running.
+            A stale result is returned as-is while it is refreshed in the background.
+        Args:
+            wait (bool): Block until a probe result is available (useful in tests and scripts).
+        """
+        with self._lock:
+            cached = self._results.get(url)
+            if cached is not None and cached[1] > self.clock():
+                return cached[0]
+            future = self._pending.get(url)
+            if future is None:
+                future = self._executor.submit(self._run_probe, url)
+                self._pending[url] = future
+        if wait:
+            return future.result()
+        return cached[0] if cached is not None else None
+
+    def _run_probe(self, url):
+        try:
+            is_valid = bool(self.probe(url))
+        except Exception:
+            is_valid = False
+        ttl = self.ttl if is_valid else self.negative_ttl
+        with self._lock:
+            self._results[url] = (is_valid, self.clock() + ttl)
+            self._pending.pop(url, None)
+        return is_valid
+
+    def invalidate(self, url=None):
+        with self._lock:
+            if url is None:
+                self._results.clear()
+            else:
+                self._results.pop(url, None)
+
+# Shared by every session in this process
+image_url_validator = ImageUrlValidator()